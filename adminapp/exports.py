@@ -0,0 +1,105 @@
+"""
+Потоковая выгрузка заказов, пользователей и продуктов в CSV или JSON Lines.
+Строки читаются через values_list().iterator(chunk_size) и сразу отдаются
+кусками, при необходимости через gzip - память не растет с размером таблицы.
+"""
+
+import csv
+import json
+import zlib
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from authapp.models import ShopUser
+from mainapp.models import Product
+from ordersapp.models import Order
+
+CHUNK_SIZE = 2000
+
+# имя выгрузки -> (колонки, queryset); заказы - строка на позицию, заказ без позиций - одна строка с пустыми
+EXPORTS = {
+    'orders': (
+        ('order_id', 'user_id', 'created', 'updated', 'status', 'is_active', 'paid', 'total_quantity', 'total_cost',
+         'product_id', 'quantity', 'price'),
+        lambda: Order.objects.order_by('pk', 'orderitems__pk'),
+    ),
+    'users': (
+        ('id', 'username', 'email', 'first_name', 'last_name', 'age', 'is_active', 'is_staff', 'is_superuser',
+         'date_joined', 'last_login'),
+        lambda: ShopUser.objects.order_by('pk'),
+    ),
+    'products': (
+        ('id', 'category_id', 'name', 'short_desc', 'price', 'quantity', 'is_active'),
+        lambda: Product.objects.order_by('pk'),
+    ),
+}
+
+# колонка выгрузки -> поле для values_list, если имена различаются
+FIELDS = {
+    'orders': {'order_id': 'pk', 'product_id': 'orderitems__product_id', 'quantity': 'orderitems__quantity',
+               'price': 'orderitems__price'},
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def get_rows(name, chunk_size=CHUNK_SIZE):
+    columns, queryset = EXPORTS[name]
+    fields = [FIELDS.get(name, {}).get(column, column) for column in columns]
+    return columns, queryset().values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+# с этих символов табличный редактор начинает формулу
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_cell(value):
+    # пользовательский текст (названия, логины, описания) не должен открываться как формула
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([csv_cell(value) for value in row])
+
+
+def jsonl_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(name, fmt='csv', compress=False, chunk_size=CHUNK_SIZE):
+    """Итератор байтовых кусков выгрузки - для StreamingHttpResponse или записи в файл."""
+    columns, rows = get_rows(name, chunk_size)
+    lines = (csv_lines if fmt == 'csv' else jsonl_lines)(columns, rows)
+    # склеиваем строки пачками: меньше мелких записей в сокет и вызовов компрессора
+    chunks = (''.join(batch).encode() for batch in iter(lambda: list(islice(lines, chunk_size)), []))
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def get_filename(name, fmt, compress=False):
+    return f'{name}.{fmt}' + ('.gz' if compress else '')
@@ -0,0 +1,88 @@
+"""
+Таблицы админки на стороне базы: фильтры, сортировка только по столбцам
+с индексом и поиск по началу названия переводятся в SQL, страница
+выбирается по ключу (KeysetPaginationMixin), размер страницы ограничен.
+"""
+
+from django.utils.http import urlencode
+
+from shop.lowercase import prefix_q
+
+
+class GridMixin:
+    """
+    Подмешивается к ListView перед KeysetPaginationMixin.
+    filters: {параметр: (подпись, {значение: (подпись, Q)})},
+    orderings: {значение sort: (подпись, keyset)} - keyset должен опираться на индекс
+    и заканчиваться уникальным столбцом; search_field - копия поля в нижнем регистре
+    (shop.lowercase) для поиска по префиксу без учета регистра.
+    """
+    filters = {}
+    orderings = {}
+    default_sort = None
+    search_field = None
+    max_per_page = 100
+
+    def get_sort(self):
+        sort = self.request.GET.get('sort', '')
+        return sort if sort in self.orderings else self.default_sort
+
+    def get_keyset(self):
+        return self.orderings[self.get_sort()][1]
+
+    def get_search(self):
+        return self.request.GET.get('q', '').strip()
+
+    def get_filter_values(self):
+        values = {}
+        for name, (label, choices) in self.filters.items():
+            value = self.request.GET.get(name, '')
+            if value in choices:
+                values[name] = value
+        return values
+
+    def filter_queryset(self, queryset):
+        for name, value in self.get_filter_values().items():
+            queryset = queryset.filter(self.filters[name][1][value][1])
+        query = self.get_search()
+        if query and self.search_field:
+            queryset = queryset.filter(prefix_q(self.search_field, query))
+        return queryset
+
+    def get_queryset(self):
+        return self.filter_queryset(super().get_queryset())
+
+    def get_paginate_by(self, queryset):
+        try:
+            per_page = int(self.request.GET.get('per_page', self.paginate_by))
+        except ValueError:
+            per_page = self.paginate_by
+        return max(1, min(per_page, self.max_per_page))
+
+    def get_grid_params(self):
+        params = dict(self.get_filter_values())
+        if self.get_search():
+            params['q'] = self.get_search()
+        if self.get_sort() != self.default_sort:
+            params['sort'] = self.get_sort()
+        if 'per_page' in self.request.GET:
+            params['per_page'] = self.get_paginate_by(None)
+        return params
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        values = self.get_filter_values()
+        context['grid'] = {
+            'q': self.get_search(),
+            'search': self.search_field is not None,
+            'sort': self.get_sort(),
+            'sorts': [(value, label) for value, (label, keyset) in self.orderings.items()],
+            'filters': [
+                (name, label, [(value, choice[0]) for value, choice in choices.items()], values.get(name, ''))
+                for name, (label, choices) in self.filters.items()
+            ],
+            'per_page': self.get_paginate_by(None),
+            # параметры таблицы для ссылок на соседние страницы
+            'query': urlencode(self.get_grid_params()),
+        }
+        return context
@@ -0,0 +1,29 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from adminapp import exports
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка заказов, пользователей или продуктов в CSV/JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(exports.EXPORTS))
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--output', help='файл; по умолчанию - stdout')
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunks = exports.stream(options['name'], options['format'], options['gzip'], options['chunk_size'])
+        if not options['output']:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            return
+        size = 0
+        with open(options['output'], 'wb') as output:
+            for chunk in chunks:
+                output.write(chunk)
+                size += len(chunk)
+        self.stderr.write(f'{options["name"]}: {size} bytes written to {options["output"]}')
@@ -1,24 +1,30 @@
 from django import template
 from django.conf import settings
 
+from shop.images import variant_url
+
 register = template.Library()
 
 
 @register.filter(name='media_folder_products')
-def media_folder_products(string):
+def media_folder_products(string, variant=None):
     if not string:
         string = 'products_images/default.svg'
 
+    if variant:
+        return variant_url(str(string), variant)
     return f'{settings.MEDIA_URL}{string}'
 
 
 @register.filter(name='media_folder_users')
-def media_folder_users(string):
+def media_folder_users(string, variant=None):
     if not string:
         string = 'users_avatars/default.svg'
 
+    if variant:
+        return variant_url(str(string), variant)
     return f'{settings.MEDIA_URL}{string}'
 
 #
 # register.filter('media_folder_products', media_folder_products)
-# register.filter('media_folder_users', media_folder_users)
\ No newline at end of file
+# register.filter('media_folder_users', media_folder_users)
@@ -16,8 +16,12 @@ urlpatterns = [
     path('categories/delete/<int:pk>/', adminapp.CategoryDeleteView.as_view(), name='category_delete'),
 
     path('products/create/category/<int:pk>/', adminapp.ProductCreateView.as_view(), name='product_create'),
+    path('products/read/', adminapp.ProductsListView.as_view(), name='products_all'),
     path('products/read/category/<int:pk>/', adminapp.ProductsListView.as_view(), name='products'),
     # path('products/read/<int:pk>/', adminapp.product_read, name='product_read'),
     path('products/update/<int:pk>/', adminapp.ProductUpdateView.as_view(), name='product_update'),
     path('products/delete/<int:pk>/', adminapp.ProductDeleteView.as_view(), name='product_delete'),
+
+    path('sales/', adminapp.SalesReportView.as_view(), name='sales'),
+    path('export/<str:name>/', adminapp.export, name='export'),
 ]
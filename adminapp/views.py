@@ -1,13 +1,23 @@
+from datetime import timedelta
+
 from django.contrib.auth.decorators import user_passes_test
+from django.db.models import Q, Sum
+from django.http import Http404, StreamingHttpResponse
+from django.utils.timezone import localdate
 from django.shortcuts import HttpResponseRedirect
 from django.urls import reverse, reverse_lazy
 from django.shortcuts import get_object_or_404, render
 
+from shop.pagination import KeysetPaginationMixin
 from authapp.models import ShopUser
 from mainapp.models import Product, ProductCategory
+from ordersapp.models import CategorySalesDaily, ProductSalesDaily
 from authapp.forms import ShopUserRegisterForm
+from adminapp import exports
+from adminapp.grid import GridMixin
 from adminapp.forms import ShopUserAdminEditForm, ProductCategoryEditForm, ProductEditForm
 
+from django.views.generic.base import TemplateView
 from django.views.generic.list import ListView
 from django.utils.decorators import method_decorator
 from django.views.generic.edit import UpdateView, DeleteView, CreateView
@@ -19,8 +29,22 @@ class DispatchMixin:
         return super().dispatch(*args, **kwargs)
 
 
-class UsersListView(DispatchMixin, ListView):
+ACTIVE_FILTER = ('активность', {'1': ('активные', Q(is_active=True)), '0': ('удаленные', Q(is_active=False))})
+
+
+class UsersListView(DispatchMixin, GridMixin, KeysetPaginationMixin, ListView):
     model = ShopUser
+    filters = {
+        'active': ACTIVE_FILTER,
+        'staff': ('персонал', {'1': ('персонал', Q(is_staff=True)), '0': ('покупатели', Q(is_staff=False))}),
+    }
+    orderings = {
+        'username': ('по логину', ('username', 'pk')),
+        '-username': ('по логину, с конца', ('-username', '-pk')),
+        'joined': ('новые регистрации', ('-date_joined', '-pk')),
+    }
+    default_sort = 'username'
+    search_field = 'username_lower'
     template_name = 'adminapp/users.html'
     context_object_name = 'objects'
     paginate_by = 2
@@ -70,8 +94,16 @@ class UserDeleteView(DeleteView):
         return HttpResponseRedirect(self.get_success_url())
 
 
-class CategoriesListView(DispatchMixin, ListView):
+class CategoriesListView(DispatchMixin, GridMixin, KeysetPaginationMixin, ListView):
     model = ProductCategory
+    filters = {'active': ACTIVE_FILTER}
+    orderings = {
+        'name': ('по названию', ('name', 'pk')),
+        '-name': ('по названию, с конца', ('-name', '-pk')),
+        'new': ('новые', ('-pk',)),
+    }
+    default_sort = 'name'
+    search_field = 'name_lower'
     template_name = 'adminapp/categories.html'
     context_object_name = 'objects'
     paginate_by = 2
@@ -116,18 +148,60 @@ class CategoryDeleteView(DeleteView):
         return HttpResponseRedirect(self.get_success_url())
 
 
-class ProductsListView(DispatchMixin, ListView):
+class ProductsListView(DispatchMixin, GridMixin, KeysetPaginationMixin, ListView):
+    """Продукты категории из пути или всего каталога с фильтром ?category=."""
     model = Product
     template_name = 'adminapp/products.html'
     context_object_name = 'objects'
-    ordering = ('-is_active', 'name')
+    filters = {
+        'active': ACTIVE_FILTER,
+        'stock': ('остаток', {'in': ('в наличии', Q(quantity__gt=0)), 'out': ('нет в наличии', Q(quantity=0))}),
+    }
+    # каждой сортировке соответствует индекс Product: (name, id), (price, id), (quantity, id), для категории -
+    # (category, ..., id)
+    orderings = {
+        'default': ('сначала активные', ('-is_active', 'name', 'pk')),
+        'name': ('по названию', ('name', 'pk')),
+        '-name': ('по названию, с конца', ('-name', '-pk')),
+        'price': ('дешевле', ('price', 'pk')),
+        '-price': ('дороже', ('-price', '-pk')),
+        'quantity': ('меньше на складе', ('quantity', 'pk')),
+        '-quantity': ('больше на складе', ('-quantity', '-pk')),
+        'new': ('новые', ('-pk',)),
+    }
+    default_sort = 'default'
+    search_field = 'name_lower'
     paginate_by = 3
     extra_context = {'title': 'админка/продукт'}
 
+    def get_category(self):
+        pk = self.kwargs.get('pk', self.request.GET.get('category', ''))
+        if not str(pk).isdigit():
+            return None
+        return get_object_or_404(ProductCategory, pk=pk)
+
+    def get(self, request, *args, **kwargs):
+        self.category = self.get_category()
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         queryset = super(ProductsListView, self).get_queryset()
-        queryset = [p for p in queryset if p.category_id == self.kwargs['pk']]
-        return queryset
+        if self.category is None:
+            return queryset
+        return queryset.filter(category=self.category)
+
+    def get_grid_params(self):
+        params = super().get_grid_params()
+        if self.category is not None and 'pk' not in self.kwargs:
+            params['category'] = self.category.pk
+        return params
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['category'] = self.category
+        if 'pk' not in self.kwargs:
+            context['categories'] = ProductCategory.objects.order_by('name').values_list('pk', 'name')
+        return context
 
 
 class ProductCreateView(DispatchMixin, CreateView):
@@ -184,3 +258,39 @@ class ProductDeleteView(DeleteView):
     def get_success_url(self):
         return reverse_lazy('admin_staff:products', kwargs={'pk': self.object.category_id})
 
+
+class SalesReportView(DispatchMixin, TemplateView):
+    """Отчеты только по дневным итогам продаж, позиции заказов не читаются."""
+    template_name = 'adminapp/sales.html'
+    extra_context = {'title': 'админка/продажи'}
+    top_size = 20
+
+    def get_days(self):
+        try:
+            return min(max(int(self.request.GET.get('days', 30)), 1), 366)
+        except ValueError:
+            return 30
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        days, today = self.get_days(), localdate()
+        context['days'] = days
+        context['by_category'] = CategorySalesDaily.objects.filter(day__gt=today - timedelta(days=days)) \
+            .select_related('category').order_by('-day', '-revenue')
+        context['top_products'] = ProductSalesDaily.objects.filter(day__gt=today - timedelta(days=7)) \
+            .values('product_id', 'product__name').annotate(quantity_sum=Sum('quantity'), revenue_sum=Sum('revenue')) \
+            .order_by('-revenue_sum')[:self.top_size]
+        return context
+
+
+@user_passes_test(lambda u: u.is_superuser)
+def export(request, name):
+    """Выгрузка ?format=csv|jsonl, &gzip=1 - сжатым файлом; отдается потоком."""
+    fmt = request.GET.get('format', 'csv')
+    if name not in exports.EXPORTS or fmt not in exports.FORMATS:
+        raise Http404('Неизвестная выгрузка')
+    compress = request.GET.get('gzip') == '1'
+    response = StreamingHttpResponse(exports.stream(name, fmt, compress),
+                                     content_type='application/gzip' if compress else exports.FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{exports.get_filename(name, fmt, compress)}"'
+    return response
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shopuser',
+            index=models.Index(fields=['date_joined', 'id'], name='user_date_joined_id_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:45
+
+from django.db import migrations, models
+
+
+def fill(apps, schema_editor):
+    """Заполняет логины в нижнем регистре; LOWER() в SQLite не понимает кириллицу, поэтому через Python."""
+    ShopUser = apps.get_model('authapp', 'ShopUser')
+    batch = []
+    for pk, username in ShopUser.objects.values_list('pk', 'username').iterator(chunk_size=2000):
+        batch.append(ShopUser(pk=pk, username_lower=username.lower()[:150]))
+        if len(batch) == 2000:
+            ShopUser.objects.bulk_update(batch, ['username_lower'])
+            batch = []
+    ShopUser.objects.bulk_update(batch, ['username_lower'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0002_shopuser_date_joined_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shopuser',
+            name='username_lower',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(fill, migrations.RunPython.noop),
+    ]
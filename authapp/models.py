@@ -1,18 +1,31 @@
 from datetime import timedelta
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils.timezone import now
 
+from shop.images import schedule_variants
+from shop.lowercase import LowercaseFieldsMixin
 
-class ShopUser(AbstractUser):
+
+class ShopUser(LowercaseFieldsMixin, AbstractUser):
+    lowercase_fields = {'username': 'username_lower'}
+
+    # для поиска в админке без учета регистра
+    username_lower = models.CharField(max_length=150, editable=False, default='', db_index=True)
     avatar = models.ImageField(upload_to='users_avatars', blank=True)
     age = models.PositiveIntegerField(verbose_name='возраст', default=18)
     activation_key = models.CharField(max_length=128, blank=True, null=True)
     activation_key_created = models.DateTimeField(auto_now_add=True, blank=True, null=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # сортировка "новые регистрации" в админке
+            models.Index(fields=['date_joined', 'id'], name='user_date_joined_id_idx'),
+        ]
+
     def is_activation_key_expired(self):
         if now() > self.activation_key_created + timedelta(hours=48):
             return True
@@ -42,3 +55,9 @@ class ShopUserProfile(models.Model):
     def save_user_profile(sender, instance, **kwargs):
         instance.shopuserprofile.save()
 
+
+@receiver(post_save, sender=ShopUser)
+def avatar_variants(sender, instance, update_fields=None, **kwargs):
+    if instance.avatar and (not update_fields or 'avatar' in update_fields):
+        name = instance.avatar.name
+        transaction.on_commit(lambda: schedule_variants(name))
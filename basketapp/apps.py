@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BasketappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'basketapp'
+
+    def ready(self):
+        import basketapp.signals  # noqa: F401
@@ -0,0 +1,135 @@
+"""
+Корзина гостя живет в кеше под ключом из cookie и не пишет в базу:
+{product_id: (quantity, price)}. Цена запоминается при добавлении, чтобы
+виджет в шапке считался без запросов; при входе корзина переносится
+в Basket по текущим ценам и остаткам.
+"""
+
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from basketapp.models import Basket, BasketSummary
+from mainapp import inventory
+from mainapp.models import Product, StockMovement
+from mainapp.catalog import get_product
+
+
+class GuestBasketItem:
+    def __init__(self, product, quantity):
+        # pk позиции гостя - это pk продукта, на нем работают ссылки изменения и удаления
+        self.pk = product.pk
+        self.product = product
+        self.quantity = quantity
+
+    @property
+    def product_cost(self):
+        return self.product.price * self.quantity
+
+
+def get_token(request):
+    token = request.COOKIES.get(settings.GUEST_BASKET_COOKIE, '')
+    return token if len(token) == 32 and token.isalnum() else ''
+
+
+def make_key(token):
+    return f'guest_basket_{token}'
+
+
+def get_items(request):
+    token = get_token(request)
+    return cache.get(make_key(token), {}) if token else {}
+
+
+def save_items(request, items):
+    """Сохраняет корзину гостя, возвращает токен - его нужно отдать в cookie через set_cookie."""
+    token = get_token(request) or uuid4().hex
+    cache.set(make_key(token), items, settings.GUEST_BASKET_TIMEOUT)
+    return token
+
+
+def set_cookie(response, token):
+    response.set_cookie(settings.GUEST_BASKET_COOKIE, token, max_age=settings.GUEST_BASKET_TIMEOUT,
+                        httponly=True, samesite='Lax')
+
+
+def add(request, pk):
+    product = get_product(pk)
+    if not product.is_active or not product.category.is_active:
+        raise Http404('Продукт не найден')
+    items = get_items(request)
+    quantity = items[pk][0] + 1 if pk in items else 1
+    items[pk] = (quantity, product.price)
+    return save_items(request, items)
+
+
+def edit(request, pk, quantity):
+    return edit_many(request, {pk: quantity})
+
+
+def edit_many(request, changes):
+    items = get_items(request)
+    for pk, quantity in changes.items():
+        if pk not in items:
+            continue
+        if quantity > 0:
+            items[pk] = (quantity, items[pk][1])
+        else:
+            del items[pk]
+    return save_items(request, items)
+
+
+def get_basket_items(request):
+    items = get_items(request)
+    basket_items = []
+    for pk, (quantity, price) in items.items():
+        try:
+            basket_items.append(GuestBasketItem(get_product(pk), quantity))
+        except Http404:
+            continue
+    return sorted(basket_items, key=lambda item: item.product.price)
+
+
+def get_summary(request):
+    items = get_items(request).values()
+    return BasketSummary(
+        items=len(items),
+        quantity=sum(quantity for quantity, price in items),
+        cost=sum(quantity * price for quantity, price in items),
+    )
+
+
+def merge(request, user):
+    """Переносит корзину гостя в Basket пользователя пачкой запросов, не построчно."""
+    token = get_token(request)
+    items = cache.get(make_key(token)) if token else None
+    if not items:
+        return
+
+    try:
+        with transaction.atomic():
+            stock = dict(Product.objects.select_for_update()
+                         .filter(pk__in=items, is_active=True, category__is_active=True)
+                         .values_list('pk', 'quantity'))
+            # больше, чем есть на складе, в корзину не кладем
+            quantities = {pk: min(items[pk][0], stock[pk]) for pk in stock if min(items[pk][0], stock[pk]) > 0}
+            if quantities:
+                inventory.reserve(quantities, StockMovement.BASKET, f'user:{user.pk}')
+                existing = list(Basket.objects.filter(user=user, product_id__in=quantities))
+                for basket in existing:
+                    basket.quantity += quantities[basket.product_id]
+                Basket.objects.bulk_update(existing, ['quantity'])
+                existing_ids = {basket.product_id for basket in existing}
+                Basket.objects.bulk_create([
+                    Basket(user=user, product_id=pk, quantity=quantity)
+                    for pk, quantity in quantities.items() if pk not in existing_ids
+                ])
+                # bulk-операции идут в обход сигналов
+                BasketSummary.rebuild([user.pk])
+    except inventory.OutOfStock:
+        # остаток успели разобрать - корзина гостя остается в кеше, вход не ломаем
+        return
+    cache.delete(make_key(token))
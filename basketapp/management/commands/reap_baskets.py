@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from basketapp.reaper import BasketReaper
+
+
+class Command(BaseCommand):
+    help = 'Удаляет брошенные корзины и возвращает зарезервированный ими остаток на склад'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl', type=int, help='секунд без изменений, по умолчанию BASKET_TTL')
+        parser.add_argument('--batch-size', type=int, help='по умолчанию BASKET_REAP_BATCH_SIZE')
+        parser.add_argument('--pause', type=float, help='пауза между пачками, по умолчанию BASKET_REAP_PAUSE')
+        parser.add_argument('--max-batches', type=int, help='не больше пачек за один проход')
+        parser.add_argument('--loop', action='store_true', help='работать постоянно, проход раз в --interval секунд')
+        parser.add_argument('--interval', type=int, default=60 * 10)
+
+    def handle(self, *args, **options):
+        while True:
+            reaper = BasketReaper(ttl=options['ttl'], batch_size=options['batch_size'], pause=options['pause'],
+                                  progress=lambda stats: self.stdout.write(
+                                      f'{stats["baskets"]} baskets, {stats["quantity"]} items restocked'))
+            stats = reaper.run(max_batches=options['max_batches'])
+            self.stdout.write(self.style.SUCCESS(
+                f'reaped {stats["baskets"]} baskets in {stats["batches"]} batches, '
+                f'{stats["quantity"]} items back in stock'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
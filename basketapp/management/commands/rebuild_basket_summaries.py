@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from basketapp.models import BasketSummary
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает итоги корзин (после массовой смены цен в обход сигналов, например импортом)'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            BasketSummary.rebuild()
+        self.stdout.write(f'basket summaries rebuilt: {BasketSummary.objects.count()} users')
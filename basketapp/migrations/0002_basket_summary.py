@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+import django.db.models.deletion
+
+
+def fill_summaries(apps, schema_editor):
+    Basket = apps.get_model('basketapp', 'Basket')
+    BasketSummary = apps.get_model('basketapp', 'BasketSummary')
+    rows = Basket.objects.values('user_id').annotate(
+        items_count=Count('pk'),
+        quantity_sum=Sum('quantity'),
+        cost_sum=Sum(ExpressionWrapper(F('quantity') * F('product__price'),
+                                       output_field=DecimalField(max_digits=12, decimal_places=2))),
+    ).order_by()
+    BasketSummary.objects.bulk_create([
+        BasketSummary(user_id=row['user_id'], items=row['items_count'],
+                      quantity=row['quantity_sum'], cost=row['cost_sum'])
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('basketapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BasketSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='basket_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('items', models.IntegerField(default=0, verbose_name='позиций')),
+                ('quantity', models.IntegerField(default=0, verbose_name='количество')),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='стоимость')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='basket',
+            name='id',
+            field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    # до ограничения одна пара (пользователь, продукт) могла занимать несколько строк
+    Basket = apps.get_model('basketapp', 'Basket')
+    duplicates = Basket.objects.values('user_id', 'product_id').annotate(
+        rows=Count('pk'), keep=Min('pk'), total=Sum('quantity')).filter(rows__gt=1).order_by()
+    for row in duplicates:
+        Basket.objects.filter(pk=row['keep']).update(quantity=row['total'])
+        Basket.objects.filter(user_id=row['user_id'], product_id=row['product_id']) \
+            .exclude(pk=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basketapp', '0002_basket_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='basket',
+            constraint=models.UniqueConstraint(fields=('user', 'product'), name='basket_user_product_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basketapp', '0003_basket_user_product_uniq'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='basket',
+            name='add_time',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='время'),
+        ),
+    ]
@@ -1,8 +1,7 @@
-from functools import cached_property
-
 from django.db import models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
 from django.conf import settings
-from mainapp.models import Product
+from mainapp.models import Product, StockItemMixin
 
 
 # class BasketQuerySet(models.QuerySet):
@@ -13,34 +12,42 @@ from mainapp.models import Product
 #         super(BasketQuerySet, self).delete(*args, **kwargs)
 
 
-class Basket(models.Model):
+class BasketQuerySet(models.QuerySet):
+    def delete_rows(self):
+        """
+        Один DELETE без выборки объектов и без сигналов pre_delete/post_delete:
+        сигналы вернули бы остаток на склад, а вызывающий код (сервис корзины,
+        уборка брошенных корзин, оформление заказа) уже записал движение остатка
+        сам. Ссылок на позиции корзины нет, так что каскад не нужен.
+        """
+        return self._raw_delete(self.db)
+
+
+class Basket(StockItemMixin, models.Model):
     # objects = BasketQuerySet.as_manager()
+    objects = BasketQuerySet.as_manager()
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='basket')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(verbose_name='количество', default=0)
-    add_time = models.DateTimeField(verbose_name='время', auto_now_add=True)
+    # время последнего изменения позиции сервисом корзины - по нему корзины считаются брошенными
+    add_time = models.DateTimeField(verbose_name='время', auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='basket_user_product_uniq'),
+        ]
 
     @property
     def product_cost(self):
         return self.product.price * self.quantity
 
-    @cached_property
-    def get_items_cached(self):
-        return self.user.basket.select_related()
-
     @property
     def total_quantity(self):
-        _items = self.get_items_cached
-#        _items = Basket.objects.filter(user=self.user)
-        _totalquantity = sum(list(map(lambda x: x.quantity, _items)))
-        return _totalquantity
+        return BasketSummary.get_for(self.user_id).quantity
 
     @property
     def total_cost(self):
-        _items = self.get_items_cached
-#        _items = Basket.objects.filter(user=self.user)
-        _totalcost = sum(list(map(lambda x: x.product_cost, _items)))
-        return _totalcost
+        return BasketSummary.get_for(self.user_id).cost
 
     @staticmethod
     def get_items(user):
@@ -57,3 +64,55 @@ class Basket(models.Model):
     #         self.product.quantity -= self.quantity
     #     self.product.save()
     #     super(self.__class__, self).save(*args, **kwargs)
+
+
+class BasketSummary(models.Model):
+    """Итоги корзины пользователя, обновляются приращениями при каждом изменении корзины."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, primary_key=True, on_delete=models.CASCADE,
+                                related_name='basket_summary')
+    items = models.IntegerField(verbose_name='позиций', default=0)
+    quantity = models.IntegerField(verbose_name='количество', default=0)
+    cost = models.DecimalField(verbose_name='стоимость', max_digits=12, decimal_places=2, default=0)
+
+    @staticmethod
+    def get_for(user_id):
+        return BasketSummary.objects.filter(user_id=user_id).first() or BasketSummary(user_id=user_id)
+
+    @staticmethod
+    def apply(user_id, items=0, quantity=0, cost=0):
+        updated = BasketSummary.objects.filter(user_id=user_id).update(
+            items=F('items') + items,
+            quantity=F('quantity') + quantity,
+            cost=F('cost') + cost,
+        )
+        if not updated:
+            # сводки еще нет - считаем с нуля, текущее изменение уже в таблице корзины
+            BasketSummary.rebuild([user_id])
+
+    @staticmethod
+    def apply_price_change(product_id, delta):
+        """Сдвигает стоимость всех корзин с продуктом одним UPDATE."""
+        quantity = Basket.objects.filter(user_id=OuterRef('user_id'), product_id=product_id) \
+            .values('user_id').annotate(total=Sum('quantity')).values('total')
+        BasketSummary.objects.filter(user__basket__product_id=product_id).update(
+            cost=F('cost') + Subquery(quantity) * delta)
+
+    @staticmethod
+    def rebuild(user_ids=None):
+        baskets = Basket.objects.all()
+        summaries = BasketSummary.objects.all()
+        if user_ids is not None:
+            baskets = baskets.filter(user_id__in=user_ids)
+            summaries = summaries.filter(user_id__in=user_ids)
+        rows = baskets.values('user_id').annotate(
+            items_count=Count('pk'),
+            quantity_sum=Sum('quantity'),
+            cost_sum=Sum(ExpressionWrapper(F('quantity') * F('product__price'),
+                                           output_field=DecimalField(max_digits=12, decimal_places=2))),
+        ).order_by()
+        summaries.delete()
+        BasketSummary.objects.bulk_create([
+            BasketSummary(user_id=row['user_id'], items=row['items_count'],
+                          quantity=row['quantity_sum'], cost=row['cost_sum'])
+            for row in rows
+        ], batch_size=1000)
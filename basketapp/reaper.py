@@ -0,0 +1,70 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from basketapp.models import Basket, BasketSummary
+from mainapp import inventory
+from mainapp.models import StockMovement
+
+
+class BasketReaper:
+    """
+    Снимает с резерва позиции корзин, не менявшиеся дольше ttl: остаток
+    возвращается одним UPDATE на пачку (сгруппировано по продукту), строки
+    удаляются пачкой. Каждая пачка - короткая транзакция, между пачками пауза,
+    а если пачка держала запись дольше max_lock, следующая берется вдвое меньше.
+    """
+
+    def __init__(self, ttl=None, batch_size=None, pause=None, max_lock=None, progress=None):
+        self.ttl = settings.BASKET_TTL if ttl is None else ttl
+        self.max_batch_size = batch_size or settings.BASKET_REAP_BATCH_SIZE
+        self.batch_size = self.max_batch_size
+        self.pause = settings.BASKET_REAP_PAUSE if pause is None else pause
+        self.max_lock = settings.BASKET_REAP_MAX_LOCK if max_lock is None else max_lock
+        self.progress = progress or (lambda stats: None)
+        self.stats = {'baskets': 0, 'quantity': 0, 'batches': 0}
+
+    def get_cutoff(self):
+        return now() - timedelta(seconds=self.ttl)
+
+    def reap_batch(self, cutoff):
+        with transaction.atomic():
+            rows = list(Basket.objects.select_for_update().filter(add_time__lt=cutoff)
+                        .order_by('add_time').values_list('pk', 'user_id', 'product_id', 'quantity')
+                        [:self.batch_size])
+            if not rows:
+                return 0
+            restock = {}
+            for pk, user_id, product_id, quantity in rows:
+                restock[product_id] = restock.get(product_id, 0) + quantity
+            inventory.apply(restock, StockMovement.REAP)
+            Basket.objects.filter(pk__in=[row[0] for row in rows]).delete_rows()
+            BasketSummary.rebuild({row[1] for row in rows})
+
+        self.stats['baskets'] += len(rows)
+        self.stats['quantity'] += sum(restock.values())
+        self.stats['batches'] += 1
+        return len(rows)
+
+    def adjust(self, elapsed):
+        if elapsed > self.max_lock:
+            self.batch_size = max(1, self.batch_size // 2)
+        elif self.batch_size < self.max_batch_size:
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+
+    def run(self, max_batches=None):
+        cutoff = self.get_cutoff()
+        while max_batches is None or self.stats['batches'] < max_batches:
+            started, size = time.monotonic(), self.batch_size
+            reaped = self.reap_batch(cutoff)
+            if not reaped:
+                break
+            self.adjust(time.monotonic() - started)
+            self.progress(self.stats)
+            if reaped < size:
+                break
+            time.sleep(self.pause)
+        return self.stats
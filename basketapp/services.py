@@ -0,0 +1,98 @@
+"""
+Изменения корзины без сигналов pre_save/pre_delete: остаток меняется через
+mainapp.inventory условным UPDATE ... WHERE quantity >= n, строка корзины -
+UPDATE с F() или INSERT по уникальному (user, product), сводка - приращением.
+Сохранение всего Product не нужно.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.http import Http404
+from django.utils.timezone import now
+
+from basketapp.models import Basket, BasketSummary
+from mainapp import inventory
+from mainapp.inventory import OutOfStock  # noqa: F401
+from mainapp.models import StockMovement
+from mainapp.catalog import get_product
+
+
+def reserve_stock(user, product_id, quantity):
+    inventory.reserve({product_id: quantity}, StockMovement.BASKET, f'user:{user.pk}')
+
+
+def get_active_product(pk):
+    product = get_product(pk)
+    if not product.is_active or not product.category.is_active:
+        raise Http404('Продукт не найден')
+    return product
+
+
+def add(user, product_id, quantity=1):
+    product = get_active_product(product_id)
+    with transaction.atomic():
+        reserve_stock(user, product_id, quantity)
+        items = 0
+        updated = Basket.objects.filter(user=user, product_id=product_id).update(
+            quantity=F('quantity') + quantity, add_time=now())
+        if not updated:
+            try:
+                # bulk_create не шлет pre_save - остаток уже списан выше
+                with transaction.atomic():
+                    Basket.objects.bulk_create([Basket(user=user, product_id=product_id, quantity=quantity,
+                                                       add_time=now())])
+                items = 1
+            except IntegrityError:
+                # параллельный запрос успел вставить строку - прибавляем к ней
+                Basket.objects.filter(user=user, product_id=product_id).update(
+                    quantity=F('quantity') + quantity, add_time=now())
+        BasketSummary.apply(user.pk, items, quantity, quantity * product.price)
+
+
+def set_quantities(user, changes):
+    """
+    Новые количества {basket_pk: quantity} за один проход, 0 - удалить позицию.
+    Чужие и несуществующие позиции пропускаются; возвращает {basket_pk: (product_id, quantity)}
+    по найденным позициям. Если остатка не хватает хоть на одну, не меняется ничего.
+    """
+    with transaction.atomic():
+        rows = {row['pk']: row for row in Basket.objects.select_for_update()
+                .filter(user=user, pk__in=changes).values('pk', 'product_id', 'quantity')}
+        result = {pk: (row['product_id'], row['quantity']) for pk, row in rows.items()}
+        stock, updates, removed = {}, {}, []
+        quantity_delta, cost_delta = 0, 0
+        for pk, row in rows.items():
+            quantity = max(changes[pk], 0)
+            delta = quantity - row['quantity']
+            if not delta:
+                continue
+            result[pk] = (row['product_id'], quantity)
+            stock[row['product_id']] = stock.get(row['product_id'], 0) - delta
+            if quantity:
+                updates[pk] = quantity
+            else:
+                removed.append(pk)
+            quantity_delta += delta
+            cost_delta += delta * get_product(row['product_id']).price
+
+        if not stock:
+            return result
+        inventory.change(stock, StockMovement.BASKET, f'user:{user.pk}')
+        if updates:
+            Basket.objects.filter(pk__in=updates).update(add_time=now(), quantity=Case(
+                *[When(pk=pk, then=Value(quantity)) for pk, quantity in updates.items()],
+                output_field=IntegerField()))
+        if removed:
+            Basket.objects.filter(pk__in=removed).delete_rows()
+        BasketSummary.apply(user.pk, -len(removed), quantity_delta, cost_delta)
+    return result
+
+
+def set_quantity(user, pk, quantity):
+    """Новое количество позиции корзины; 0 - удалить позицию."""
+    if pk not in set_quantities(user, {pk: quantity}):
+        raise Http404('Позиция корзины не найдена')
+
+
+def remove(user, pk):
+    set_quantity(user, pk, 0)
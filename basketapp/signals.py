@@ -0,0 +1,52 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from basketapp import guest
+from basketapp.models import Basket, BasketSummary
+from mainapp import inventory
+from mainapp.models import Product, StockMovement
+
+
+@receiver(pre_save, sender=Basket)
+def basket_stock_save(sender, instance, **kwargs):
+    inventory.item_saved(instance, StockMovement.BASKET, f'user:{instance.user_id}')
+
+
+@receiver(post_delete, sender=Basket)
+def basket_stock_delete(sender, instance, **kwargs):
+    inventory.item_deleted(instance, StockMovement.BASKET, f'user:{instance.user_id}')
+
+
+@receiver(post_save, sender=Basket)
+def basket_summary_save(sender, instance, created, **kwargs):
+    loaded = getattr(instance, 'loaded_stock', None)
+    if created:
+        BasketSummary.apply(instance.user_id, 1, instance.quantity, instance.quantity * instance.product.price)
+    elif loaded is None or loaded[0] != instance.product_id:
+        # прежнее состояние неизвестно или сменился продукт - считаем заново
+        BasketSummary.rebuild([instance.user_id])
+    elif instance.quantity != loaded[1]:
+        delta = instance.quantity - loaded[1]
+        BasketSummary.apply(instance.user_id, 0, delta, delta * instance.product.price)
+
+
+@receiver(post_delete, sender=Basket)
+def basket_summary_delete(sender, instance, **kwargs):
+    quantity = (getattr(instance, 'loaded_stock', None) or (None, instance.quantity))[1]
+    BasketSummary.apply(instance.user_id, -1, -quantity, -quantity * instance.product.price)
+
+
+@receiver(post_save, sender=Product)
+def product_price_changed(sender, instance, created, **kwargs):
+    # прежнюю цену читает mainapp.signals.product_load_old
+    old_price = getattr(instance, 'old_price', None)
+    if not created and old_price is not None and old_price != instance.price:
+        BasketSummary.apply_price_change(instance.pk, instance.price - old_price)
+
+
+@receiver(user_logged_in)
+def guest_basket_merge(sender, request, user, **kwargs):
+    # вход и через форму, и через соцсети заканчивается auth.login
+    if request is not None:
+        guest.merge(request, user)
@@ -8,4 +8,5 @@ urlpatterns = [
     path('add/<int:pk>/', basketapp.basket_add, name='add'),
     path('remove/<int:pk>/', basketapp.BasketDeleteView.as_view(), name='remove'),
     path('edit/<int:pk>/<int:quantity>/', basketapp.basket_edit, name='edit'),
+    path('edit/', basketapp.basket_edit_batch, name='edit_batch'),
 ]
\ No newline at end of file
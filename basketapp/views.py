@@ -1,13 +1,19 @@
-from django.shortcuts import render, HttpResponseRedirect, get_object_or_404
+import json
+
+from django.contrib import messages
+from django.shortcuts import render, HttpResponseRedirect
 from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DeleteView, CreateView
 
-from basketapp.models import Basket
-from mainapp.models import Product
+from basketapp import guest, services
+from basketapp.models import Basket, BasketSummary
+from mainapp.catalog import get_product
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 from django.template.loader import render_to_string
 from django.http import JsonResponse
+from django.utils.formats import localize
+from django.views.decorators.http import require_POST
 
 
 class BasketView(ListView):
@@ -18,59 +24,140 @@ class BasketView(ListView):
     extra_context = {'title': 'корзина'}
 
     def get_queryset(self):
-        return super(BasketView, self).get_queryset().filter(user=self.request.user)
-
-    @method_decorator(login_required)
-    def dispatch(self, *args, **kwargs):
-        return super(BasketView, self).dispatch(*args, **kwargs)
+        if not self.request.user.is_authenticated:
+            return guest.get_basket_items(self.request)
+        return super(BasketView, self).get_queryset().filter(user=self.request.user) \
+            .select_related('product__category')
 
 
-@login_required
 def basket_add(request, pk):
-    if 'login' in request.META.get('HTTP_REFERER'):
+    if 'login' in request.META.get('HTTP_REFERER', ''):
         return HttpResponseRedirect(reverse('products:product', args=[pk]))
 
-    product = get_object_or_404(Product, pk=pk)
-    basket = Basket.objects.filter(user=request.user, product=product).first()
-
-    if not basket:
-        basket = Basket(user=request.user, product=product)
+    if not request.user.is_authenticated:
+        token = guest.add(request, pk)
+        response = HttpResponseRedirect(request.META.get('HTTP_REFERER') or reverse('products:product', args=[pk]))
+        guest.set_cookie(response, token)
+        return response
 
-    basket.quantity += 1
-    basket.save()
+    try:
+        services.add(request.user, pk)
+    except services.OutOfStock:
+        messages.error(request, 'Недостаточно товара на складе')
 
-    return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
+    return HttpResponseRedirect(request.META.get('HTTP_REFERER') or reverse('products:product', args=[pk]))
 
 
 class BasketDeleteView(DeleteView):
     model = Basket
 
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated and request.method == 'POST':
+            token = guest.edit(request, kwargs['pk'], 0)
+            response = HttpResponseRedirect(self.get_success_url())
+            guest.set_cookie(response, token)
+            return response
+        return self.dispatch_user(request, *args, **kwargs)
+
     @method_decorator(login_required)
-    def dispatch(self, *args, **kwargs):
+    def dispatch_user(self, *args, **kwargs):
         return super(BasketDeleteView, self).dispatch(*args, **kwargs)
 
     def get_success_url(self):
-        return self.request.META.get('HTTP_REFERER')
+        return self.request.META.get('HTTP_REFERER') or reverse('basket:view')
+
+    def delete(self, request, *args, **kwargs):
+        services.remove(request.user, kwargs['pk'])
+        return HttpResponseRedirect(self.get_success_url())
 
 
-@login_required
 def basket_edit(request, pk, quantity):
     if request.is_ajax():
         quantity = int(quantity)
-        new_basket_item = Basket.objects.get(pk=int(pk))
 
-        if quantity > 0:
-            new_basket_item.quantity = quantity
-            new_basket_item.save()
-        else:
-            new_basket_item.delete()
-
-        basket_items = Basket.objects.filter(user=request.user).order_by('product__price')
+        if not request.user.is_authenticated:
+            token = guest.edit(request, int(pk), quantity)
+            content = {
+                'basket_items': guest.get_basket_items(request),
+                'basket_summary': guest.get_summary(request),
+            }
+            result = render_to_string('basketapp/inc/inc_basket_list.html', content, request=request)
+            response = JsonResponse({'result': result})
+            guest.set_cookie(response, token)
+            return response
+
+        status, error = 200, None
+        try:
+            services.set_quantity(request.user, int(pk), quantity)
+        except services.OutOfStock:
+            status, error = 409, 'out of stock'
+
+        basket_items = Basket.objects.filter(user=request.user).select_related('product__category') \
+            .order_by('product__price')
 
         content = {
             'basket_items': basket_items,
+            'basket_summary': BasketSummary.get_for(request.user.pk),
         }
 
-        result = render_to_string('basketapp/inc/inc_basket_list.html', content)
-
-        return JsonResponse({'result': result})
+        result = render_to_string('basketapp/inc/inc_basket_list.html', content, request=request)
+
+        # при нехватке остатка список все равно отдаем - клиент вернет поле к прежнему количеству
+        return JsonResponse({'result': result, 'error': error}, status=status)
+
+
+MAX_BATCH_CHANGES = 100
+
+
+def parse_changes(request):
+    """{"items": {"<pk позиции>": количество, ...}} из тела запроса."""
+    data = json.loads(request.body.decode('utf-8'))
+    items = data['items']
+    if not isinstance(items, dict) or len(items) > MAX_BATCH_CHANGES:
+        raise ValueError('items must be an object with at most %d entries' % MAX_BATCH_CHANGES)
+    return {int(pk): int(quantity) for pk, quantity in items.items()}
+
+
+def summary_json(summary):
+    return {'items': summary.items, 'quantity': summary.quantity, 'cost': localize(summary.cost)}
+
+
+@require_POST
+def basket_edit_batch(request):
+    """
+    Изменение нескольких позиций корзины за один запрос. В ответе только
+    измененные строки и итоги - без перерисовки всего списка (ее по-прежнему
+    отдает basket_edit).
+    """
+    try:
+        changes = parse_changes(request)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({'error': 'invalid request'}, status=400)
+
+    if request.user.is_authenticated:
+        try:
+            rows = services.set_quantities(request.user, changes)
+        except services.OutOfStock:
+            return JsonResponse({'error': 'out of stock'}, status=409)
+        result = {pk: quantity for pk, (product_id, quantity) in rows.items()}
+        prices = {pk: get_product(product_id).price for pk, (product_id, quantity) in rows.items()}
+        summary = BasketSummary.get_for(request.user.pk)
+    else:
+        known = guest.get_items(request)
+        token = guest.edit_many(request, changes)
+        items = guest.get_items(request)
+        result = {pk: items[pk][0] if pk in items else 0 for pk in changes if pk in known}
+        prices = {pk: items[pk][1] for pk in result if pk in items}
+        summary = guest.get_summary(request)
+
+    data = {
+        'items': [{'pk': pk, 'quantity': quantity, 'cost': localize(quantity * prices[pk])}
+                  for pk, quantity in result.items() if quantity and pk in prices],
+        'removed': [pk for pk, quantity in result.items() if not quantity],
+        'missing': [pk for pk in changes if pk not in result],
+        'summary': summary_json(summary),
+    }
+    response = JsonResponse(data)
+    if not request.user.is_authenticated:
+        guest.set_cookie(response, token)
+    return response
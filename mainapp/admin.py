@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import ProductCategory, Product
+from .models import ProductCategory, Product, StockMovement
 
 admin.site.register(ProductCategory)
 admin.site.register(Product)
+admin.site.register(StockMovement)
@@ -0,0 +1,174 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.http import JsonResponse, Http404
+from django.urls import reverse
+from django.views.decorators.http import condition, require_GET
+
+from shop.pagination import KeysetPaginator
+from . import cache as catalog_cache, search
+from .models import Product, ProductCategory
+
+PRODUCT_FIELDS = ('pk', 'name', 'short_desc', 'description', 'price', 'quantity', 'category', 'image', 'url')
+DEFAULT_PRODUCT_FIELDS = ('pk', 'name', 'short_desc', 'price', 'category', 'image', 'url')
+PRODUCT_ORDERINGS = {
+    'pk': ('pk',),
+    'price': ('price', 'pk'),
+    '-price': ('-price', '-pk'),
+    'name': ('name', 'pk'),
+}
+CATEGORY_FIELDS = ('pk', 'name', 'description')
+
+
+class ApiError(ValueError):
+    pass
+
+
+def parse_list(request, name, allowed=None, limit=None):
+    raw = request.GET.get(name, '')
+    values = [value.strip() for value in raw.split(',') if value.strip()]
+    if allowed is not None:
+        unknown = [value for value in values if value not in allowed]
+        if unknown:
+            raise ApiError(f'unknown {name}: {", ".join(unknown)}')
+    if limit is not None and len(values) > limit:
+        raise ApiError(f'too many {name}, max {limit}')
+    return values
+
+
+def parse_ids(request):
+    try:
+        return [int(value) for value in parse_list(request, 'ids', limit=settings.API_MAX_LIMIT)]
+    except ValueError as error:
+        if isinstance(error, ApiError):
+            raise
+        raise ApiError('ids must be integers')
+
+
+def parse_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.API_DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError('limit must be an integer')
+    return max(1, min(limit, settings.API_MAX_LIMIT))
+
+
+def product_fields(request):
+    return tuple(parse_list(request, 'fields', PRODUCT_FIELDS)) or DEFAULT_PRODUCT_FIELDS
+
+
+def product_namespaces(request):
+    # остатки меняются на каждое добавление в корзину - учитываем их, только если их запросили
+    try:
+        fields = product_fields(request)
+    except ApiError:
+        fields = ()
+    if 'quantity' in fields:
+        return catalog_cache.CATALOG + (catalog_cache.STOCK,)
+    return catalog_cache.CATALOG
+
+
+def catalog_etag(namespaces):
+    def etag(request, *args, **kwargs):
+        versions = '-'.join(str(version) for version in catalog_cache.get_versions(namespaces(request)))
+        query = md5(request.get_full_path().encode('utf-8')).hexdigest()
+        return f'{versions}-{query}'
+    return etag
+
+
+def serialize_product(row, fields):
+    data = {}
+    for field in fields:
+        if field == 'category':
+            data['category'] = row['category_id']
+        elif field == 'image':
+            data['image'] = f'{settings.MEDIA_URL}{row["image"]}' if row['image'] else None
+        elif field == 'url':
+            data['url'] = reverse('products:product', args=[row['pk']])
+        else:
+            data[field] = row[field]
+    return data
+
+
+def get_products_payload(request):
+    fields = product_fields(request)
+    ids = parse_ids(request)
+    ordering = request.GET.get('ordering', 'pk')
+    if ordering not in PRODUCT_ORDERINGS:
+        raise ApiError(f'unknown ordering: {ordering}')
+    keyset = PRODUCT_ORDERINGS[ordering]
+
+    db_fields = {'pk'} | {field.lstrip('-') for field in keyset}
+    for field in fields:
+        if field == 'category':
+            db_fields.add('category_id')
+        elif field == 'image':
+            db_fields.add('image')
+        elif field != 'url':
+            db_fields.add(field)
+
+    query = request.GET.get('q', '').strip()
+    if query:
+        # поиск по индексу - id в порядке релевантности, дальше как выборка по ids
+        ids = search.search_ids(query, parse_limit(request))
+        if not ids:
+            return {'results': []}
+
+    queryset = Product.objects.filter(is_active=True, category__is_active=True)
+    if ids:
+        queryset = queryset.filter(pk__in=ids)
+    category = request.GET.get('category')
+    if category:
+        if not category.isdigit():
+            raise ApiError('category must be an integer')
+        queryset = queryset.filter(category__pk=category)
+    queryset = queryset.values(*db_fields)
+
+    if ids:
+        rows = {row['pk']: row for row in queryset}
+        return {'results': [serialize_product(rows[pk], fields) for pk in ids if pk in rows]}
+
+    paginator = KeysetPaginator(queryset, parse_limit(request), keyset)
+    try:
+        page = paginator.page(request.GET.get('cursor', ''))
+    except Http404:
+        raise ApiError('invalid cursor')
+    return {
+        'results': [serialize_product(row, fields) for row in page],
+        'next': page.next_cursor or None,
+        'previous': page.previous_cursor or None,
+    }
+
+
+def api_response(request, namespaces, payload):
+    try:
+        key = f'api_{md5(request.get_full_path().encode("utf-8")).hexdigest()}'
+        data = catalog_cache.get_or_set(key, lambda: payload(request), namespaces=namespaces)
+    except ApiError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    response = JsonResponse(data)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@require_GET
+@condition(etag_func=catalog_etag(product_namespaces))
+def products(request):
+    """
+    Продукты каталога в json.
+    ?ids=1,2,3 - выборка по id за один запрос, ?fields=name,price - только нужные поля,
+    ?cursor=...&limit=50&ordering=price - постраничный вывод по ключу,
+    ?q=...&limit=20 - поиск по названию и описанию (подсказки в формах).
+    """
+    return api_response(request, product_namespaces(request), get_products_payload)
+
+
+def get_categories_payload(request):
+    fields = tuple(parse_list(request, 'fields', CATEGORY_FIELDS)) or CATEGORY_FIELDS
+    return {'results': list(ProductCategory.objects.filter(is_active=True).order_by('name').values(*fields))}
+
+
+@require_GET
+@condition(etag_func=catalog_etag(lambda request: (catalog_cache.CATEGORY,)))
+def categories(request):
+    return api_response(request, (catalog_cache.CATEGORY,), get_categories_payload)
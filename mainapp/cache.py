@@ -0,0 +1,74 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CATEGORY = 'category'
+PRODUCT = 'product'
+STOCK = 'stock'
+
+CATALOG = (CATEGORY, PRODUCT)
+
+
+def _version_key(namespace):
+    return f'catalog_version_{namespace}'
+
+
+def _new_version():
+    # версия от времени, чтобы после вытеснения ключа из кеша не вернуться к старым записям
+    return int(time.time() * 1000)
+
+
+def get_versions(namespaces):
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_version(namespace):
+    return get_versions((namespace,))[0]
+
+
+def bump_version(namespace):
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+
+
+def bump_version_on_commit(namespace):
+    transaction.on_commit(lambda: bump_version(namespace))
+
+
+def make_key(key, namespaces=CATALOG):
+    versions = '_'.join(str(version) for version in get_versions(namespaces))
+    return f'catalog_{versions}_{key}'
+
+
+def set(key, value, namespaces=CATALOG, timeout=None):
+    if settings.LOW_CACHE:
+        cache.set(make_key(key, namespaces), value, timeout or settings.CATALOG_CACHE_TIMEOUT)
+
+
+def get_or_set(key, default, namespaces=CATALOG, timeout=None):
+    """
+    Достает значение из кеша каталога или вычисляет его через default().
+    Ключ включает версии пространств имен, поэтому при изменении каталога
+    старые записи просто перестают читаться и доживают до вытеснения.
+    default() должен возвращать вычисленные данные (список), а не ленивый queryset.
+    """
+    if not settings.LOW_CACHE:
+        return default()
+
+    versioned_key = make_key(key, namespaces)
+    value = cache.get(versioned_key)
+    if value is None:
+        value = default()
+        cache.set(versioned_key, value, timeout or settings.CATALOG_CACHE_TIMEOUT)
+    return value
@@ -0,0 +1,54 @@
+"""
+Закешированные выборки каталога. Лежат отдельно от views, чтобы сервисы
+и формы других приложений брали их без импорта модуля представлений.
+"""
+
+from django.shortcuts import get_object_or_404
+
+from . import cache as catalog_cache
+from .models import ProductCategory, Product
+
+
+def get_links_menu():
+    return catalog_cache.get_or_set(
+        'links_menu',
+        lambda: list(ProductCategory.objects.filter(is_active=True)),
+        namespaces=(catalog_cache.CATEGORY,),
+    )
+
+
+def get_category(pk):
+    return catalog_cache.get_or_set(
+        f'category_{pk}',
+        lambda: get_object_or_404(ProductCategory, pk=pk),
+        namespaces=(catalog_cache.CATEGORY,),
+    )
+
+
+def get_products():
+    return catalog_cache.get_or_set(
+        'products',
+        lambda: list(Product.objects.filter(is_active=True, category__is_active=True).select_related('category')),
+    )
+
+
+def get_product(pk):
+    return catalog_cache.get_or_set(
+        f'product_{pk}',
+        lambda: get_object_or_404(Product.objects.select_related('category'), pk=pk),
+    )
+
+
+def get_products_oredered_by_price():
+    return catalog_cache.get_or_set(
+        'products_oredered_by_price',
+        lambda: list(Product.objects.filter(is_active=True, category__is_active=True).order_by('price')),
+    )
+
+
+def get_products_in_category_oredered_by_price(pk):
+    return catalog_cache.get_or_set(
+        f'products_in_category_oredered_by_price_{pk}',
+        lambda: list(Product.objects.filter(category__pk=pk, is_active=True, category__is_active=True)
+                     .order_by('price')),
+    )
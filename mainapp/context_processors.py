@@ -1,12 +1,12 @@
-from basketapp.models import Basket
+from basketapp import guest
+from basketapp.models import BasketSummary
 
 
 def basket(request):
-    basket_list = []
     if request.user.is_authenticated:
-#        basket_list = Basket(user=request.user).get_items_cached
-        basket_list = Basket.get_items(request.user).select_related()
-#        basket_list = Basket.objects.filter(user=request.user).select_related()
+        summary = BasketSummary.get_for(request.user.pk)
+    else:
+        summary = guest.get_summary(request)
     return {
-        'basket': basket_list
+        'basket_summary': summary
     }
@@ -0,0 +1,90 @@
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from . import cache as catalog_cache
+from .models import Product
+
+PRICE_FILTERS = ('min_price', 'max_price')
+
+
+def filters_query(filters):
+    """Строка запроса для ссылок пагинации и фасетов."""
+    return urlencode(sorted((name, 'on' if value is True else value) for name, value in filters.items()))
+
+
+def filters_key(filters, category_pk=0):
+    return md5(f'{category_pk}?{filters_query(filters)}'.encode()).hexdigest()
+
+
+def filters_timeout(filters):
+    """С фильтром "в наличии" данные зависят от остатков - кешируются ненадолго, без версии STOCK."""
+    if filters.get('in_stock'):
+        return settings.STOCK_CACHE_TIMEOUT
+    return None
+
+
+def apply_filters(queryset, filters):
+    if filters.get('min_price') is not None:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if filters.get('max_price') is not None:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+    if filters.get('in_stock'):
+        queryset = queryset.filter(quantity__gt=0)
+    return queryset
+
+
+def get_products(filters, category_pk=0):
+    queryset = Product.objects.filter(is_active=True, category__is_active=True)
+    if category_pk:
+        queryset = queryset.filter(category__pk=category_pk)
+    return apply_filters(queryset, filters)
+
+
+def get_category_counts(filters):
+    """{category_pk: count} с учетом цены и наличия, но без выбранной категории."""
+    def count():
+        rows = get_products(filters).order_by().values('category').annotate(count=Count('pk'))
+        return {row['category']: row['count'] for row in rows}
+
+    return catalog_cache.get_or_set(f'facet_categories_{filters_key(filters)}', count,
+                                    timeout=filters_timeout(filters))
+
+
+def get_price_counts(filters, category_pk=0):
+    """Число продуктов в каждом диапазоне PRICE_FACET_RANGES - одним запросом."""
+    filters = {name: value for name, value in filters.items() if name not in PRICE_FILTERS}
+
+    def count():
+        aggregates = {}
+        for num, (low, high) in enumerate(settings.PRICE_FACET_RANGES):
+            condition = Q(price__gte=low)
+            if high is not None:
+                condition &= Q(price__lt=high)
+            aggregates[f'range_{num}'] = Count('pk', filter=condition)
+        totals = get_products(filters, category_pk).aggregate(**aggregates)
+        return [{
+            'min_price': low,
+            'max_price': high,
+            'count': totals[f'range_{num}'],
+        } for num, (low, high) in enumerate(settings.PRICE_FACET_RANGES)]
+
+    return catalog_cache.get_or_set(f'facet_prices_{filters_key(filters, category_pk)}', count,
+                                    timeout=filters_timeout(filters))
+
+
+def get_in_stock_count(filters, category_pk=0):
+    """Отдельно от остальных фасетов: на кешированную страницу число подставляется при каждом запросе."""
+    filters = dict(filters, in_stock=True)
+    return catalog_cache.get_or_set(f'facet_in_stock_{filters_key(filters, category_pk)}',
+                                    get_products(filters, category_pk).count,
+                                    timeout=filters_timeout(filters))
+
+
+def get_facets(filters, category_pk=0):
+    return {
+        'categories': get_category_counts(filters),
+        'prices': get_price_counts(filters, category_pk),
+    }
@@ -0,0 +1,18 @@
+from django import forms
+
+
+class ProductFilterForm(forms.Form):
+    min_price = forms.DecimalField(label='цена от', required=False, min_value=0, max_digits=8, decimal_places=2)
+    max_price = forms.DecimalField(label='цена до', required=False, min_value=0, max_digits=8, decimal_places=2)
+    in_stock = forms.BooleanField(label='в наличии', required=False)
+
+    def __init__(self, *args, **kwargs):
+        super(ProductFilterForm, self).__init__(*args, **kwargs)
+        for field_name, field in self.fields.items():
+            if not field_name.startswith('in_'):
+                field.widget.attrs['class'] = 'form-control'
+
+    def get_filters(self):
+        if not self.is_valid():
+            return {}
+        return {name: value for name, value in self.cleaned_data.items() if value not in (None, False)}
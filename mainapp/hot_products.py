@@ -0,0 +1,82 @@
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Min, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Product
+
+POOL_KEY = 'hot_products_pool'
+# сколько раз добирать случайные id, если попали в дыры между id или в неактивные продукты
+SAMPLE_ROUNDS = 5
+
+
+def sample_ids(products, size):
+    """
+    Случайные id из products без ORDER BY RANDOM(): числа берутся из диапазона id
+    таблицы (MIN/MAX по первичному ключу), база только проверяет, какие из них подходят.
+    """
+    bounds = Product.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return []
+    low, high = bounds['low'], bounds['high']
+    ids = set()
+    for _ in range(SAMPLE_ROUNDS):
+        candidates = {random.randint(low, high) for _ in range(min(size * 2, high - low + 1))} - ids
+        ids.update(products.filter(pk__in=candidates).values_list('pk', flat=True))
+        if len(ids) >= size:
+            break
+    return random.sample(sorted(ids), min(size, len(ids)))
+
+
+def build_pool():
+    """
+    Возвращает (ids, weights) кандидатов в горячее предложение.
+    Без веса - случайная выборка id, с весом - первые по остатку
+    на складе ('quantity') или по продажам ('sales').
+    """
+    products = Product.objects.filter(is_active=True, category__is_active=True)
+    size = settings.HOT_PRODUCT_POOL_SIZE
+    weight = settings.HOT_PRODUCT_WEIGHT
+
+    if weight == 'quantity':
+        rows = list(products.filter(quantity__gt=0).order_by('-quantity').values_list('pk', 'quantity')[:size])
+    elif weight == 'sales':
+        rows = list(products.annotate(sold=Coalesce(Sum('orderitem__quantity'), 0))
+                    .filter(sold__gt=0).order_by('-sold').values_list('pk', 'sold')[:size])
+    else:
+        return sample_ids(products, size), None
+
+    if not rows:
+        return [], None
+    ids, weights = zip(*rows)
+    return list(ids), list(weights)
+
+
+def get_pool():
+    """
+    Пул живет HOT_PRODUCT_POOL_TIMEOUT вне версий кеша каталога - правка продукта его
+    не сбрасывает, обновляет команда refresh_hot_products. Продукт, снятый с продажи
+    за это время, отсеивает get_hot_product.
+    """
+    if not settings.LOW_CACHE:
+        return build_pool()
+    pool = cache.get(POOL_KEY)
+    if pool is None:
+        pool = refresh_pool()
+    return pool
+
+
+def refresh_pool():
+    pool = build_pool()
+    if settings.LOW_CACHE:
+        cache.set(POOL_KEY, pool, settings.HOT_PRODUCT_POOL_TIMEOUT)
+    return pool
+
+
+def choose_hot_product_id():
+    ids, weights = get_pool()
+    if not ids:
+        return None
+    return random.choices(ids, weights=weights)[0]
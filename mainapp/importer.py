@@ -0,0 +1,288 @@
+import csv
+import json
+import os
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from basketapp.models import Basket, BasketSummary
+
+from . import cache as catalog_cache, inventory, search
+from .models import ProductCategory, Product, StockMovement
+
+PRODUCT_FIELDS = ('image', 'short_desc', 'description', 'price', 'quantity', 'is_active')
+CATEGORY_FIELDS = ('description', 'is_active')
+FORMATS = ('json', 'jsonl', 'csv')
+
+
+class CatalogImportError(ValueError):
+    pass
+
+
+def iter_json_array(fp, chunk_size=1 << 16):
+    """Читает элементы json-массива по одному, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+
+    def more():
+        nonlocal buffer, eof
+        chunk = fp.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+        return not eof
+
+    while not buffer.lstrip():
+        if not more():
+            return
+    buffer = buffer.lstrip()
+    if buffer[0] != '[':
+        raise CatalogImportError('JSON array expected')
+    buffer = buffer[1:]
+
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if not buffer:
+            if not more():
+                raise CatalogImportError('unexpected end of JSON array')
+            continue
+        if buffer[0] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if not more():
+                raise CatalogImportError('broken JSON array')
+            continue
+        buffer = buffer[end:]
+        yield item
+
+
+def iter_jsonl(fp):
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_csv(fp):
+    yield from csv.DictReader(fp)
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lstrip('.').lower()
+    if ext not in FORMATS:
+        raise CatalogImportError(f'unknown file format: {path}')
+    return ext
+
+
+def iter_rows(path, fmt=None):
+    fmt = fmt or detect_format(path)
+    with open(path, 'r', encoding='utf-8', newline='' if fmt == 'csv' else None) as fp:
+        if fmt == 'json':
+            yield from iter_json_array(fp)
+        elif fmt == 'jsonl':
+            yield from iter_jsonl(fp)
+        else:
+            yield from iter_csv(fp)
+
+
+def to_python(model, field_name, value):
+    field = model._meta.get_field(field_name)
+    if isinstance(value, str) and field.get_internal_type() == 'BooleanField':
+        value = value.strip().lower() in ('1', 'true', 't', 'yes', 'y', 'on')
+    value = field.to_python(value)
+    # валидаторы поля (длина имени, число знаков цены) - иначе строка упадет в базе на IntegrityError.
+    # Диапазон Positive-полей на SQLite в валидаторы не попадает - проверяем сами
+    field.run_validators(value)
+    if field.get_internal_type().startswith('Positive') and value is not None and value < 0:
+        raise ValidationError('значение не может быть отрицательным')
+    return value
+
+
+def parse_row(model, row, fields, num):
+    """Значения полей fields из строки файла; ошибка указывает номер строки num."""
+    values = {}
+    for field in fields:
+        if field not in row:
+            continue
+        try:
+            values[field] = to_python(model, field, row[field])
+        except ValidationError as error:
+            raise CatalogImportError(f'row {num}: {field}: {" ".join(error.messages)}')
+    return values
+
+
+def iter_batches(rows, batch_size, skip=0):
+    batch = []
+    for num, row in enumerate(rows, 1):
+        if num <= skip:
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield num, batch
+            batch = []
+    if batch:
+        yield num, batch
+
+
+class Checkpoint:
+    """Номер последней записанной строки файла - для продолжения прерванного импорта."""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = os.path.abspath(source)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'r', encoding='utf-8') as fp:
+            data = json.load(fp)
+        return data['rows'] if data.get('source') == self.source else 0
+
+    def save(self, rows):
+        if not self.path:
+            return
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fp:
+            json.dump({'source': self.source, 'rows': rows}, fp)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CatalogImporter:
+    """
+    Пакетный импорт каталога: upsert категорий по имени и продуктов по (категория, имя)
+    через bulk_create/bulk_update, каждая пачка - в своей транзакции.
+    """
+
+    def __init__(self, batch_size=500, progress=None):
+        self.batch_size = batch_size
+        self.progress = progress or (lambda rows, stats: None)
+        self.category_ids = {}
+        # продукты со смененной ценой - их корзинам нужно пересчитать итоги
+        self.repriced = set()
+        self.stats = {'created': 0, 'updated': 0, 'categories': 0}
+
+    def load_categories(self, names=None):
+        queryset = ProductCategory.objects.all()
+        if names is not None:
+            queryset = queryset.filter(name__in=names)
+        self.category_ids.update(queryset.values_list('name', 'pk'))
+
+    def ensure_categories(self, names):
+        missing = sorted(set(names) - set(self.category_ids))
+        if not missing:
+            return
+        ProductCategory.objects.bulk_create([ProductCategory(name=name).fill_lowercase() for name in missing],
+                                            ignore_conflicts=True)
+        self.load_categories(missing)
+        self.stats['categories'] += len(missing)
+
+    def import_categories(self, rows):
+        self.load_categories()
+        for num, batch in iter_batches(rows, self.batch_size):
+            items = {}
+            for row_num, row in enumerate(batch, num - len(batch) + 1):
+                parse_row(ProductCategory, row, ('name',), row_num)
+                items[row['name']] = parse_row(ProductCategory, row, CATEGORY_FIELDS, row_num)
+            to_create, to_update = [], []
+            for name, values in items.items():
+                if name in self.category_ids:
+                    to_update.append(ProductCategory(pk=self.category_ids[name], name=name, **values))
+                else:
+                    to_create.append(ProductCategory(name=name, **values).fill_lowercase())
+            with transaction.atomic():
+                ProductCategory.objects.bulk_create(to_create, batch_size=self.batch_size)
+                for field in CATEGORY_FIELDS:
+                    objects = [obj for obj in to_update if field in items[obj.name]]
+                    if objects:
+                        ProductCategory.objects.bulk_update(objects, [field], batch_size=self.batch_size)
+            self.load_categories([obj.name for obj in to_create])
+            self.stats['categories'] += len(to_create)
+            self.progress(num, self.stats)
+
+    def import_products(self, rows, checkpoint=None):
+        self.load_categories()
+        skip = checkpoint.load() if checkpoint else 0
+        for num, batch in iter_batches(rows, self.batch_size, skip=skip):
+            self.import_product_batch(batch, num - len(batch) + 1)
+            if checkpoint:
+                checkpoint.save(num)
+            self.progress(num, self.stats)
+        if checkpoint:
+            checkpoint.clear()
+
+    def load_products(self, keys):
+        return {
+            (category_id, name): (pk, quantity, price)
+            for category_id, name, pk, quantity, price in Product.objects.filter(
+                category_id__in={key[0] for key in keys},
+                name__in={key[1] for key in keys},
+            ).values_list('category_id', 'name', 'pk', 'quantity', 'price')
+        }
+
+    def import_product_batch(self, batch, first_row=1):
+        parsed = []
+        for row_num, row in enumerate(batch, first_row):
+            parse_row(Product, row, ('name',), row_num)
+            parsed.append(parse_row(Product, row, PRODUCT_FIELDS, row_num))
+        self.ensure_categories(row['category'] for row in batch)
+
+        items = {}
+        for row, values in zip(batch, parsed):
+            items[(self.category_ids[row['category']], row['name'])] = values
+
+        existing = self.load_products(items)
+
+        to_create, to_update, deltas = [], {}, {}
+        for (category_id, name), values in items.items():
+            if (category_id, name) in existing:
+                pk, quantity, price = existing[(category_id, name)]
+                # строки группируем по набору колонок, чтобы не затереть отсутствующие поля значениями по умолчанию
+                to_update.setdefault(tuple(sorted(values)), []).append(
+                    Product(pk=pk, category_id=category_id, name=name, **values))
+                if 'quantity' in values:
+                    deltas[pk] = values['quantity'] - quantity
+                if 'price' in values and values['price'] != price:
+                    self.repriced.add(pk)
+            else:
+                to_create.append(Product(category_id=category_id, name=name, **values).fill_lowercase())
+
+        try:
+            self.write_product_batch(to_create, to_update, deltas)
+        except IntegrityError as error:
+            # пачка откатилась целиком - строку внутри нее база не называет
+            raise CatalogImportError(f'rows {first_row}-{first_row + len(batch) - 1}: {error}')
+
+        self.stats['created'] += len(to_create)
+        self.stats['updated'] += sum(len(objects) for objects in to_update.values())
+
+    def write_product_batch(self, to_create, to_update, deltas):
+        with transaction.atomic():
+            Product.objects.bulk_create(to_create, batch_size=self.batch_size)
+            for fields, objects in to_update.items():
+                if fields:
+                    Product.objects.bulk_update(objects, fields, batch_size=self.batch_size)
+            # остатки меняются в обход inventory - дописываем журнал движений
+            if to_create:
+                keys = {(obj.category_id, obj.name) for obj in to_create}
+                deltas.update((pk, quantity) for key, (pk, quantity, price) in self.load_products(keys).items()
+                              if key in keys)
+            inventory.record(deltas, StockMovement.IMPORT)
+
+    def finish(self):
+        # bulk-операции не шлют сигналы - сбрасываем кеш каталога и индекс поиска
+        # и пересчитываем итоги корзин с подорожавшими или подешевевшими продуктами сами
+        search.rebuild_index(batch_size=self.batch_size)
+        user_ids = list(Basket.objects.filter(product_id__in=self.repriced).values_list('user_id', flat=True)
+                        .distinct().order_by())
+        for start in range(0, len(user_ids), self.batch_size):
+            with transaction.atomic():
+                BasketSummary.rebuild(user_ids[start:start + self.batch_size])
+        self.repriced = set()
+        for namespace in (catalog_cache.CATEGORY, catalog_cache.PRODUCT, catalog_cache.STOCK):
+            catalog_cache.bump_version(namespace)
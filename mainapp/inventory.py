@@ -0,0 +1,150 @@
+"""
+Все изменения остатков идут через журнал StockMovement: строка журнала плюс
+узкий UPDATE одного столбца quantity с F()-приращением, несколько продуктов -
+одним запросом через CASE. Полный Product.save() для остатков не нужен.
+"""
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from . import cache as catalog_cache
+from .models import Product, StockMovement
+
+
+class OutOfStock(Exception):
+    pass
+
+
+def _deltas_case(deltas):
+    return Case(*[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+                default=Value(0), output_field=IntegerField())
+
+
+def _log(deltas, reason, reference):
+    StockMovement.objects.bulk_create([
+        StockMovement(product_id=pk, delta=delta, reason=reason, reference=reference)
+        for pk, delta in deltas.items()
+    ], batch_size=500)
+    catalog_cache.bump_version_on_commit(catalog_cache.STOCK)
+
+
+def _clean(deltas):
+    return {pk: delta for pk, delta in deltas.items() if delta}
+
+
+def apply(deltas, reason, reference=''):
+    """Безусловно применяет {product_id: delta} одним UPDATE - для возвратов на склад."""
+    deltas = _clean(deltas)
+    if not deltas:
+        return
+    with transaction.atomic():
+        Product.objects.filter(pk__in=deltas).update(quantity=F('quantity') + _deltas_case(deltas))
+        _log(deltas, reason, reference)
+
+
+def apply_entries(entries, reason):
+    """
+    Как apply, но журнал пишется по строкам (product_id, delta, reference) - например,
+    по заказам, а остаток меняется одним UPDATE на сумму по каждому продукту.
+    """
+    entries = [entry for entry in entries if entry[1]]
+    if not entries:
+        return
+    deltas = {}
+    for pk, delta, reference in entries:
+        deltas[pk] = deltas.get(pk, 0) + delta
+    deltas = _clean(deltas)
+    with transaction.atomic():
+        if deltas:
+            Product.objects.filter(pk__in=deltas).update(quantity=F('quantity') + _deltas_case(deltas))
+        StockMovement.objects.bulk_create([
+            StockMovement(product_id=pk, delta=delta, reason=reason, reference=reference)
+            for pk, delta, reference in entries
+        ], batch_size=500)
+        catalog_cache.bump_version_on_commit(catalog_cache.STOCK)
+
+
+def reserve(quantities, reason, reference=''):
+    """
+    Списывает {product_id: quantity} одним условным UPDATE ... WHERE quantity >= n.
+    Если хоть одного продукта не хватает, не списывается ничего и поднимается OutOfStock.
+    """
+    quantities = _clean(quantities)
+    if not quantities:
+        return
+    with transaction.atomic():
+        needed = _deltas_case(quantities)
+        updated = Product.objects.filter(pk__in=quantities, quantity__gte=needed) \
+            .update(quantity=F('quantity') - needed)
+        if updated != len(quantities):
+            raise OutOfStock(sorted(quantities))
+        _log({pk: -quantity for pk, quantity in quantities.items()}, reason, reference)
+
+
+def change(deltas, reason, reference=''):
+    """Положительные приращения возвращаются на склад, отрицательные списываются с проверкой остатка."""
+    deltas = _clean(deltas)
+    with transaction.atomic():
+        reserve({pk: -delta for pk, delta in deltas.items() if delta < 0}, reason, reference)
+        apply({pk: delta for pk, delta in deltas.items() if delta > 0}, reason, reference)
+
+
+def record(deltas, reason, reference=''):
+    """Только запись в журнал - когда quantity уже изменен в обход inventory (форма админки, импорт)."""
+    deltas = _clean(deltas)
+    if deltas:
+        _log(deltas, reason, reference)
+
+
+def ledger_totals(product_ids=None):
+    movements = StockMovement.objects.all()
+    if product_ids is not None:
+        movements = movements.filter(product_id__in=product_ids)
+    return dict(movements.values('product_id').annotate(total=Sum('delta')).order_by()
+                .values_list('product_id', 'total'))
+
+
+def find_mismatches(batch_size=1000):
+    """(product_id, quantity, сумма по журналу) для продуктов, где они расходятся."""
+    product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+        totals = ledger_totals(batch)
+        for pk, quantity in Product.objects.filter(pk__in=batch).values_list('pk', 'quantity'):
+            total = totals.get(pk, 0)
+            if total != quantity:
+                yield pk, quantity, total
+
+
+def reconcile(mismatches, trust='ledger'):
+    """
+    Устраняет расхождения: trust='ledger' - остаток продукта пересчитывается из журнала,
+    trust='stock' - в журнал дописывается поправка до фактического остатка.
+    """
+    mismatches = list(mismatches)
+    with transaction.atomic():
+        if trust == 'ledger':
+            totals = {pk: max(total, 0) for pk, quantity, total in mismatches}
+            if totals:
+                Product.objects.filter(pk__in=totals).update(quantity=_deltas_case(totals))
+                catalog_cache.bump_version_on_commit(catalog_cache.STOCK)
+        else:
+            record({pk: quantity - total for pk, quantity, total in mismatches}, StockMovement.RECONCILE)
+    return len(mismatches)
+
+
+def item_saved(instance, reason, reference=''):
+    """Списание под сохраняемую позицию StockItemMixin - только разница с прочитанным состоянием."""
+    loaded = getattr(instance, 'loaded_stock', None)
+    if loaded is None and instance.pk:
+        loaded = type(instance).objects.filter(pk=instance.pk).values_list('product_id', 'quantity').first()
+    deltas = {}
+    if loaded:
+        deltas[loaded[0]] = loaded[1]
+    deltas[instance.product_id] = deltas.get(instance.product_id, 0) - instance.quantity
+    change(deltas, reason, reference)
+
+
+def item_deleted(instance, reason, reference=''):
+    loaded = getattr(instance, 'loaded_stock', None) or (instance.product_id, instance.quantity)
+    apply({loaded[0]: loaded[1]}, reason, reference)
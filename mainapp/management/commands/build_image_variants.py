@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shop.images import iter_media_images, make_executor, make_variants
+
+
+class Command(BaseCommand):
+    help = 'Нарезает варианты картинок товаров и аватаров (media/variants)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('folders', nargs='*', default=['products_images', 'users_avatars'])
+        parser.add_argument('--workers', type=int, default=settings.IMAGE_VARIANT_WORKERS)
+        parser.add_argument('--force', action='store_true', help='пересоздать существующие варианты')
+
+    def handle(self, *args, **options):
+        names = list(iter_media_images(options['folders']))
+        made = 0
+        with make_executor(options['workers']) as executor:
+            for count in executor.map(make_variants, names, [options['force']] * len(names), chunksize=8):
+                made += count
+        self.stdout.write(f'{len(names)} images, {made} variants')
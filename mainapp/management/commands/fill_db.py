@@ -1,39 +1,19 @@
-import json
 import os
 
 from django.core.management.base import BaseCommand
 
 from authapp.models import ShopUser
-from mainapp.models import ProductCategory, Product
+from mainapp.importer import CatalogImporter, iter_rows
 
 JSON_PATH = 'mainapp/json'
 
 
-def load_from_json(file_name):
-    with open(os.path.join(JSON_PATH, file_name + '.json'), 'r', encoding='utf-8') as infile:
-        return json.load(infile)
-
-
 class Command(BaseCommand):
     def handle(self, *args, **options):
+        importer = CatalogImporter()
+        importer.import_categories(iter_rows(os.path.join(JSON_PATH, 'categories.json')))
+        importer.import_products(iter_rows(os.path.join(JSON_PATH, 'products.json')))
+        importer.finish()
 
-        categories = load_from_json('categories')
-
-        ProductCategory.objects.all().delete()
-        for category in categories:
-            new_category = ProductCategory(**category)
-            new_category.save()
-
-        products = load_from_json('products')
-
-        Product.objects.all().delete()
-        for product in products:
-            category_name = product['category']
-            _category = ProductCategory.objects.get(name=category_name)
-            product['category'] = _category
-            new_product = Product(**product)
-            new_product.save()
-
-        ShopUser.objects.all().delete()
-        ShopUser.objects.create_superuser('admin', 'django@shop.local', '123', age=33, first_name='Nekr')
-
+        if not ShopUser.objects.filter(username='admin').exists():
+            ShopUser.objects.create_superuser('admin', 'django@shop.local', '123', age=33, first_name='Nekr')
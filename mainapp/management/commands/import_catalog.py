@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mainapp.importer import CatalogImporter, CatalogImportError, Checkpoint, iter_rows, FORMATS
+
+
+class Command(BaseCommand):
+    help = 'Пакетный импорт каталога из JSON/JSONL/CSV (upsert по имени категории и продукта)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('products', nargs='?', help='файл продуктов')
+        parser.add_argument('--categories', help='файл категорий')
+        parser.add_argument('--format', choices=FORMATS, help='формат файлов, по умолчанию по расширению')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--checkpoint', help='файл контрольной точки для продолжения прерванного импорта')
+
+    def handle(self, *args, **options):
+        if not options['products'] and not options['categories']:
+            raise CommandError('nothing to import: pass a products file and/or --categories')
+
+        started = time.monotonic()
+
+        def progress(rows, stats):
+            rate = rows / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f'{rows} rows ({rate:.0f}/s): {stats["created"]} created, '
+                              f'{stats["updated"]} updated, {stats["categories"]} categories')
+
+        importer = CatalogImporter(batch_size=options['batch_size'], progress=progress)
+        try:
+            if options['categories']:
+                importer.import_categories(iter_rows(options['categories'], options['format']))
+            if options['products']:
+                checkpoint = Checkpoint(options['checkpoint'], options['products'])
+                importer.import_products(iter_rows(options['products'], options['format']), checkpoint)
+        except (CatalogImportError, KeyError, ValueError) as error:
+            raise CommandError(f'import failed: {error!r}')
+        finally:
+            importer.finish()
+
+        self.stdout.write(self.style.SUCCESS(f'done in {time.monotonic() - started:.1f}s: {importer.stats}'))
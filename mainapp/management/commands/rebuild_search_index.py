@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from mainapp.search import rebuild_index, is_fts_available
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс продуктов (FTS5)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not is_fts_available():
+            self.stdout.write('FTS5 index is available only on SQLite, nothing to do')
+            return
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(f'search index rebuilt: {total} products')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from mainapp.inventory import find_mismatches, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Сверяет остатки продуктов с журналом движений StockMovement'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', choices=('ledger', 'stock'),
+                            help='ledger - пересчитать остатки из журнала, stock - дописать в журнал поправки')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        mismatches = list(find_mismatches(batch_size=options['batch_size']))
+        for pk, quantity, total in mismatches[:50]:
+            self.stdout.write(f'product {pk}: quantity {quantity}, ledger {total}')
+        if len(mismatches) > 50:
+            self.stdout.write(f'... and {len(mismatches) - 50} more')
+
+        if options['fix'] and mismatches:
+            reconcile(mismatches, trust=options['fix'])
+            self.stdout.write(self.style.SUCCESS(f'{len(mismatches)} products reconciled ({options["fix"]})'))
+        else:
+            self.stdout.write(f'{len(mismatches)} mismatches')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from mainapp.hot_products import refresh_pool, get_pool
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает пул горячих предложений (запускать по расписанию)'
+
+    def handle(self, *args, **options):
+        refresh_pool()
+        ids, weights = get_pool()
+        self.stdout.write(f'hot products pool: {len(ids)} ids')
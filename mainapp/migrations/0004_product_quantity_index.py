@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0003_product_fts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'quantity'], name='product_category_quantity_idx'),
+        ),
+    ]
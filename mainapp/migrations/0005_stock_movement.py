@@ -0,0 +1,45 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.timezone import now
+
+
+def seed_stock(apps, schema_editor):
+    # текущие остатки - начальная точка журнала
+    Product = apps.get_model('mainapp', 'Product')
+    StockMovement = apps.get_model('mainapp', 'StockMovement')
+    created = now()
+    batch = []
+    for pk, quantity in Product.objects.filter(quantity__gt=0).values_list('pk', 'quantity').iterator():
+        batch.append(StockMovement(product_id=pk, delta=quantity, reason='seed', created=created))
+        if len(batch) >= 1000:
+            StockMovement.objects.bulk_create(batch)
+            batch = []
+    StockMovement.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0004_product_quantity_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField(verbose_name='изменение')),
+                ('reason', models.CharField(choices=[('seed', 'начальный остаток'), ('import', 'импорт каталога'), ('adjust', 'ручная правка'), ('basket', 'корзина'), ('order', 'заказ'), ('reconcile', 'сверка')], max_length=16, verbose_name='причина')),
+                ('reference', models.CharField(blank=True, max_length=64, verbose_name='основание')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='время')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='mainapp.product', verbose_name='продукт')),
+            ],
+            options={
+                'verbose_name': 'движение остатка',
+                'verbose_name_plural': 'движения остатков',
+            },
+        ),
+        migrations.RunPython(seed_stock, migrations.RunPython.noop),
+    ]
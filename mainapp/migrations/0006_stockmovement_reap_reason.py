@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0005_stock_movement'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='reason',
+            field=models.CharField(choices=[('seed', 'начальный остаток'), ('import', 'импорт каталога'), ('adjust', 'ручная правка'), ('basket', 'корзина'), ('order', 'заказ'), ('reconcile', 'сверка'), ('reap', 'брошенная корзина')], max_length=16, verbose_name='причина'),
+        ),
+    ]
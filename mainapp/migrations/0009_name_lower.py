@@ -0,0 +1,39 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:44
+
+from django.db import migrations, models
+
+
+def fill(apps, schema_editor):
+    """Заполняет копии в нижнем регистре; LOWER() в SQLite не понимает кириллицу, поэтому через Python."""
+    for model_name in ('ProductCategory', 'Product'):
+        model = apps.get_model('mainapp', model_name)
+        max_length = model._meta.get_field('name_lower').max_length
+        rows = model.objects.values_list('pk', 'name').iterator(chunk_size=2000)
+        batch = []
+        for pk, value in rows:
+            batch.append(model(pk=pk, name_lower=(value or '').lower()[:max_length]))
+            if len(batch) == 2000:
+                model.objects.bulk_update(batch, ['name_lower'])
+                batch = []
+        model.objects.bulk_update(batch, ['name_lower'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0008_product_grid_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='name_lower',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=128),
+        ),
+        migrations.AddField(
+            model_name='productcategory',
+            name='name_lower',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(fill, migrations.RunPython.noop),
+    ]
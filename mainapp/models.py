@@ -1,12 +1,18 @@
 from django.db import models
 
+from shop.lowercase import LowercaseFieldsMixin
+
+
+class ProductCategory(LowercaseFieldsMixin, models.Model):
+    lowercase_fields = {'name': 'name_lower'}
 
-class ProductCategory(models.Model):
     name = models.CharField(
         verbose_name='имя',
         max_length=64,
         unique=True,
     )
+    # для поиска в админке без учета регистра
+    name_lower = models.CharField(max_length=64, editable=False, default='', db_index=True)
     description = models.TextField(
         verbose_name='описание',
         blank=True,
@@ -21,12 +27,16 @@ class ProductCategory(models.Model):
         return self.name
 
 
-class Product(models.Model):
+class Product(LowercaseFieldsMixin, models.Model):
+    lowercase_fields = {'name': 'name_lower'}
+
     category = models.ForeignKey(ProductCategory, verbose_name='Категория', on_delete=models.CASCADE)
     name = models.CharField(
         verbose_name='имя продукта',
         max_length=128,
     )
+    # для поиска в админке без учета регистра
+    name_lower = models.CharField(max_length=128, editable=False, default='', db_index=True)
     image = models.ImageField(
         upload_to='products_images',
         blank=True,
@@ -56,9 +66,79 @@ class Product(models.Model):
         db_index=True,
     )
 
+    class Meta:
+        indexes = [
+            # ключи постраничного вывода каталога и админки
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['category', 'price', 'id'], name='product_category_price_id_idx'),
+            models.Index(fields=['category', 'is_active', 'name'], name='product_category_name_idx'),
+            # фильтр "в наличии" и сортировка по остатку
+            models.Index(fields=['category', 'quantity', 'id'], name='product_category_qty_id_idx'),
+            # сортировки и поиск по префиксу в общем списке продуктов админки
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+            models.Index(fields=['quantity', 'id'], name='product_quantity_id_idx'),
+            models.Index(fields=['is_active', 'name', 'id'], name='product_active_name_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.category.name})"
 
     @staticmethod
     def get_items():
         return Product.objects.filter(is_active=True).order_by('category', 'name')
+
+
+class StockItemMixin:
+    """
+    Позиция, которая держит остаток продукта (корзина, заказ). Помнит product_id
+    и quantity на момент чтения, чтобы сигналы списывали только разницу.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_stock = None
+        if 'product_id' in instance.__dict__ and 'quantity' in instance.__dict__:
+            instance.loaded_stock = (instance.product_id, instance.quantity)
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.loaded_stock = (self.product_id, self.quantity)
+
+
+class StockMovement(models.Model):
+    """Журнал движения остатков: строки только добавляются, сумма delta по продукту равна его quantity."""
+    SEED = 'seed'
+    IMPORT = 'import'
+    ADJUSTMENT = 'adjust'
+    BASKET = 'basket'
+    ORDER = 'order'
+    RECONCILE = 'reconcile'
+    REAP = 'reap'
+    CANCEL = 'cancel'
+
+    REASON_CHOICES = (
+        (SEED, 'начальный остаток'),
+        (IMPORT, 'импорт каталога'),
+        (ADJUSTMENT, 'ручная правка'),
+        (BASKET, 'корзина'),
+        (ORDER, 'заказ'),
+        (RECONCILE, 'сверка'),
+        (REAP, 'брошенная корзина'),
+        (CANCEL, 'отмена заказа'),
+    )
+
+    product = models.ForeignKey(Product, verbose_name='продукт', on_delete=models.CASCADE,
+                                related_name='stock_movements')
+    delta = models.IntegerField(verbose_name='изменение')
+    reason = models.CharField(verbose_name='причина', max_length=16, choices=REASON_CHOICES)
+    reference = models.CharField(verbose_name='основание', max_length=64, blank=True)
+    created = models.DateTimeField(verbose_name='время', auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'движение остатка'
+        verbose_name_plural = 'движения остатков'
+
+    def __str__(self):
+        return f'{self.product_id}: {self.delta:+d} ({self.reason})'
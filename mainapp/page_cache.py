@@ -0,0 +1,70 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+from django.utils.safestring import mark_safe
+
+from . import cache as catalog_cache
+
+DONUT_HOLE = '<!-- donut:user-menu -->'
+DONUT_TEMPLATE = 'inc/inc_user_menu.html'
+
+
+class DonutCacheMixin:
+    """
+    Кеширует страницу целиком для всех пользователей ("бублик"): вместо
+    меню пользователя с корзиной в кешированный html попадает метка,
+    которая после чтения из кеша заменяется фрагментом DONUT_TEMPLATE,
+    отрисованным для текущего запроса.
+    """
+    donut_namespaces = catalog_cache.CATALOG
+    # параметры запроса, от которых зависит страница; остальные (utm и т.п.) в ключ не попадают,
+    # иначе ими можно забить кеш
+    donut_params = ()
+
+    def get_donut_namespaces(self):
+        return self.donut_namespaces
+
+    def get_donut_params(self):
+        return self.donut_params
+
+    def get_donut_timeout(self):
+        return settings.DONUT_CACHE_TIMEOUT
+
+    def get_donut_key(self):
+        params = sorted((name, value) for name in self.get_donut_params()
+                        for value in self.request.GET.getlist(name))
+        path = md5(f'{self.request.path}?{urlencode(params)}'.encode('utf-8')).hexdigest()
+        return catalog_cache.make_key(f'page_{path}', self.get_donut_namespaces())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['donut_hole'] = mark_safe(DONUT_HOLE)
+        return context
+
+    def fill_donut(self, content):
+        hole = render_to_string(DONUT_TEMPLATE, request=self.request)
+        return content.replace(DONUT_HOLE, hole, 1)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not settings.LOW_CACHE or request.method not in ('GET', 'HEAD'):
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+                if DONUT_HOLE.encode('utf-8') in response.content:
+                    response.content = self.fill_donut(response.content.decode(response.charset))
+            return response
+
+        key = self.get_donut_key()
+        content = cache.get(key)
+        if content is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200 or not hasattr(response, 'render'):
+                return response
+            response.render()
+            content = response.content.decode(response.charset)
+            cache.set(key, content, self.get_donut_timeout())
+        return HttpResponse(self.fill_donut(content))
@@ -0,0 +1,103 @@
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Product
+
+FTS_TABLE = 'mainapp_product_fts'
+FTS_COLUMNS = ('name', 'short_desc', 'description')
+# веса bm25 по колонкам: совпадение в названии важнее описания
+FTS_WEIGHTS = (10.0, 4.0, 1.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(query):
+    """Превращает пользовательский ввод в безопасный запрос FTS5: все слова, по префиксу."""
+    tokens = TOKEN_RE.findall(query.lower())
+    return ' '.join(f'"{token}"*' for token in tokens[:10])
+
+
+def index_product(product):
+    if not is_fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, short_desc, description) VALUES (%s, %s, %s, %s)',
+            [product.pk, product.name, product.short_desc, product.description],
+        )
+
+
+def remove_product(pk):
+    if not is_fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild_index(batch_size=1000):
+    """Перестраивает индекс целиком пачками по batch_size строк, возвращает число строк."""
+    if not is_fts_available():
+        return 0
+    total = 0
+    rows = Product.objects.order_by().values_list('pk', *FTS_COLUMNS)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, name, short_desc, description) VALUES (%s, %s, %s, %s)',
+                    batch,
+                )
+                total += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, short_desc, description) VALUES (%s, %s, %s, %s)',
+                batch,
+            )
+            total += len(batch)
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def search_ids(query, limit=None):
+    """Id активных продуктов из активных категорий в порядке релевантности."""
+    limit = limit or settings.SEARCH_RESULTS_LIMIT
+    match = build_match_query(query)
+    if not match:
+        return []
+
+    if not is_fts_available():
+        lookup = Q()
+        for token in TOKEN_RE.findall(query)[:10]:
+            lookup &= Q(name__icontains=token) | Q(short_desc__icontains=token)
+        return list(Product.objects.filter(lookup, is_active=True, category__is_active=True)
+                    .order_by('name').values_list('pk', flat=True)[:limit])
+
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT p.id FROM {FTS_TABLE} f '
+            f'JOIN mainapp_product p ON p.id = f.rowid '
+            f'JOIN mainapp_productcategory c ON c.id = p.category_id '
+            f'WHERE {FTS_TABLE} MATCH %s AND p.is_active AND c.is_active '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_products(query, limit=None):
+    ids = search_ids(query, limit)
+    products = Product.objects.select_related('category').in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
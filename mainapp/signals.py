@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from mainapp import cache as catalog_cache, inventory, search
+from mainapp.models import ProductCategory, Product, StockMovement
+from shop.images import schedule_variants
+
+
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def category_changed(sender, instance, **kwargs):
+    catalog_cache.bump_version_on_commit(catalog_cache.CATEGORY)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, update_fields=None, **kwargs):
+    # списание/возврат остатков из корзины меняет только quantity - витрину не сбрасываем
+    if not update_fields or set(update_fields) != {'quantity'}:
+        catalog_cache.bump_version_on_commit(catalog_cache.PRODUCT)
+    catalog_cache.bump_version_on_commit(catalog_cache.STOCK)
+
+
+@receiver(post_save, sender=Product)
+def product_search_index(sender, instance, update_fields=None, **kwargs):
+    if not update_fields or set(update_fields) & set(search.FTS_COLUMNS):
+        search.index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_search_remove(sender, instance, **kwargs):
+    search.remove_product(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def product_image_variants(sender, instance, update_fields=None, **kwargs):
+    if instance.image and (not update_fields or 'image' in update_fields):
+        name = instance.image.name
+        transaction.on_commit(lambda: schedule_variants(name))
+
+
+@receiver(pre_save, sender=Product)
+def product_load_old(sender, instance, update_fields=None, **kwargs):
+    instance.old_price = instance.old_quantity = None
+    if instance.pk and (not update_fields or {'price', 'quantity'} & set(update_fields)):
+        old = Product.objects.filter(pk=instance.pk).values_list('price', 'quantity').first()
+        if old:
+            instance.old_price, instance.old_quantity = old
+
+
+@receiver(post_save, sender=Product)
+def product_stock_record(sender, instance, created, **kwargs):
+    # форма админки пишет quantity напрямую - в журнал попадает только разница
+    if created:
+        inventory.record({instance.pk: instance.quantity}, StockMovement.SEED)
+    elif instance.old_quantity is not None and instance.old_quantity != instance.quantity:
+        inventory.record({instance.pk: instance.quantity - instance.old_quantity}, StockMovement.ADJUSTMENT)
@@ -1,5 +1,6 @@
 from django.urls import path
-from .views import ProductsView, ProductView
+from . import api
+from .views import ProductsView, ProductView, SearchView
 
 app_name = 'mainapp'
 
@@ -8,4 +9,7 @@ urlpatterns = [
     path('category/<int:pk>/', ProductsView.as_view(), name='category'),
     # path('category/<int:pk>/page/<int:page>', ProductsView.as_view(), name='page'),
     path('product/<int:pk>/', ProductView.as_view(), name='product'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('api/products/', api.products, name='api_products'),
+    path('api/categories/', api.categories, name='api_categories'),
 ]
@@ -1,90 +1,46 @@
-from django.core.cache import cache
-from django.shortcuts import render, get_object_or_404
+from decimal import Decimal
+from hashlib import md5
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.safestring import mark_safe
 from django.views.generic import ListView, DetailView
 
-from django.conf import settings
-from .models import ProductCategory, Product
+from shop.pagination import KeysetPaginationMixin
+from . import cache as catalog_cache, facets
+from .catalog import get_category, get_links_menu, get_product, get_products_in_category_oredered_by_price
+from .forms import ProductFilterForm
+from .hot_products import choose_hot_product_id
+from .page_cache import DonutCacheMixin
+from .models import Product
+from .search import search_products
 from basketapp.models import Basket
-import random
-
-
-def get_links_menu():
-    if settings.LOW_CACHE:
-        key = 'links_menu'
-        links_menu = cache.get(key)
-        if links_menu is None:
-            links_menu = ProductCategory.objects.filter(is_active=True)
-            cache.set(key, links_menu)
-        return links_menu
-    else:
-        return ProductCategory.objects.filter(is_active=True)
-
-
-def get_category(pk):
-    if settings.LOW_CACHE:
-        key = f'category_{pk}'
-        category = cache.get(key)
-        if category is None:
-            category = get_object_or_404(ProductCategory, pk=pk)
-            cache.set(key, category)
-        return category
-    else:
-        return get_object_or_404(ProductCategory, pk=pk)
-
-
-def get_products():
-    if settings.LOW_CACHE:
-        key = 'products'
-        products = cache.get(key)
-        if products is None:
-            products = Product.objects.filter(is_active=True, category__is_active=True).select_related('category')
-            cache.set(key, products)
-        return products
-    else:
-        return Product.objects.filter(is_active=True, category__is_active=True).select_related('category')
-
-
-def get_product(pk):
-    if settings.LOW_CACHE:
-        key = f'product_{pk}'
-        product = cache.get(key)
-        if product is None:
-            product = get_object_or_404(Product, pk=pk)
-            cache.set(key, product)
-        return product
-    else:
-        return get_object_or_404(Product, pk=pk)
-
-
-def get_products_oredered_by_price():
-    if settings.LOW_CACHE:
-        key = 'products_oredered_by_price'
-        products = cache.get(key)
-        if products is None:
-            products = Product.objects.filter(is_active=True, category__is_active=True).order_by('price')
-            cache.set(key, products)
-        return products
-    else:
-        return Product.objects.filter(is_active=True, category__is_active=True).order_by('price')
-
-
-def get_products_in_category_oredered_by_price(pk):
-    if settings.LOW_CACHE:
-        key = f'products_in_category_oredered_by_price_{pk}'
-        products = cache.get(key)
-        if products is None:
-            products = Product.objects.filter(category__pk=pk, is_active=True, category__is_active=True).order_by('price')
-            cache.set(key, products)
-        return products
-    else:
-        return Product.objects.filter(category__pk=pk, is_active=True, category__is_active=True).order_by('price')
-
-
-class ProductsView(ListView):
+
+# метка в кешированной странице категории, на ее место подставляется число товаров в наличии
+IN_STOCK_HOLE = '<!-- donut:in-stock -->'
+
+
+class ProductsView(DonutCacheMixin, KeysetPaginationMixin, ListView):
     model = Product
     ordering = 'price'
+    keyset = ('price', 'pk')
     context_object_name = 'products'
     paginate_by = 3
+    donut_params = ('cursor', *ProductFilterForm.base_fields)
+
+    def get_donut_timeout(self):
+        # страница с фильтром "в наличии" зависит от остатков
+        return facets.filters_timeout(self.filters) or super().get_donut_timeout()
+
+    def fill_donut(self, content):
+        content = super().fill_donut(content)
+        if 'pk' in self.kwargs:
+            # число товаров в наличии не хранится в кешированной странице, у него свой короткий кеш
+            in_stock = facets.get_in_stock_count(self.filters, self.kwargs['pk'])
+            content = content.replace(IN_STOCK_HOLE, str(in_stock), 1)
+        return content
 
     def get_template_names(self):
         if 'pk' in self.kwargs:
@@ -99,27 +55,65 @@ class ProductsView(ListView):
     #         return []
 
     def get_hot_product(self):
-        products = get_products()
-        return random.sample(list(products), 1)[0]
+        pk = choose_hot_product_id()
+        if pk is None:
+            return None
+        try:
+            product = get_product(pk)
+        except Http404:
+            return None
+        # пул обновляется по таймауту - продукт могли снять с продажи
+        if not product.is_active or not product.category.is_active:
+            return None
+        return product
 #        return random.sample(list(self.get_queryset()), 1)[0]
 
-    def get_same_products(self, ):
-        hot_product = self.get_hot_product()
-        same_products = self.get_queryset().filter(category=hot_product.category).exclude(pk=hot_product.pk)[:3]
-        return same_products
+    def get_same_products(self, hot_product):
+        if hot_product is None:
+            return []
+        same_products = [product for product in get_products_in_category_oredered_by_price(hot_product.category_id)
+                         if product.pk != hot_product.pk]
+        return same_products[:3]
+
+    @cached_property
+    def filter_form(self):
+        return ProductFilterForm(self.request.GET)
+
+    @cached_property
+    def filters(self):
+        return self.filter_form.get_filters()
 
     def get_queryset(self):
-        queryset = get_products_oredered_by_price()
         # queryset = super(ProductsView, self).get_queryset()
-        if 'pk' in self.kwargs:
-            if self.kwargs['pk'] == 0:
-                return queryset
-            else:
-                # queryset = queryset.filter(category_id__pk=self.kwargs['pk'])
-                # return queryset
-                return get_products_in_category_oredered_by_price(self.kwargs['pk'])
-        else:
-            return queryset
+        return facets.get_products(self.filters, self.kwargs.get('pk', 0))
+
+    def get_page_rows(self, paginator, cursor):
+        key = (f'products_page_{facets.filters_key(self.filters, self.kwargs.get("pk", 0))}_'
+               f'{paginator.per_page}_{md5(cursor.encode()).hexdigest()}')
+        return catalog_cache.get_or_set(key, lambda: paginator.get_rows(cursor),
+                                        timeout=facets.filters_timeout(self.filters))
+
+    def get_total_count(self, queryset):
+        return catalog_cache.get_or_set(f'products_count_{facets.filters_key(self.filters, self.kwargs.get("pk", 0))}',
+                                        queryset.count, timeout=facets.filters_timeout(self.filters))
+
+    def get_facets(self, links_menu):
+        filters = self.filters
+        counts = facets.get_facets(filters, self.kwargs.get('pk', 0))
+        without_price = {name: value for name, value in filters.items() if name not in facets.PRICE_FILTERS}
+        for price_range in counts['prices']:
+            price_filters = dict(without_price, min_price=price_range['min_price'])
+            if price_range['max_price'] is not None:
+                price_filters['max_price'] = price_range['max_price'] - Decimal('0.01')
+            price_range['query'] = facets.filters_query(price_filters)
+        counts['categories'] = [{
+            'pk': category.pk,
+            'name': category.name,
+            'count': counts['categories'].get(category.pk, 0),
+        } for category in links_menu]
+        counts['in_stock'] = mark_safe(IN_STOCK_HOLE)
+        counts['in_stock_query'] = facets.filters_query(dict(filters, in_stock=True))
+        return counts
 
     def get_category(self):
         if 'pk' in self.kwargs:
@@ -138,12 +132,18 @@ class ProductsView(ListView):
         context['title'] = 'продукты'
         context['links_menu'] = get_links_menu()
         context['category'] = self.get_category()
-        context['hot_product'] = self.get_hot_product()
-        context['same_products'] = self.get_same_products()
+        if 'pk' in self.kwargs:
+            context['filter_form'] = self.filter_form
+            context['filter_query'] = facets.filters_query(self.filters)
+            context['facets'] = self.get_facets(context['links_menu'])
+        else:
+            hot_product = self.get_hot_product()
+            context['hot_product'] = hot_product
+            context['same_products'] = self.get_same_products(hot_product)
         return context
 
 
-class ProductView(DetailView):
+class ProductView(DonutCacheMixin, DetailView):
     model = Product
     context_object_name = 'product'
     template_name = 'mainapp/product.html'
@@ -163,3 +163,41 @@ class ProductView(DetailView):
         context['links_menu'] = get_links_menu()
 
         return context
+
+
+class SearchView(ListView):
+    template_name = 'mainapp/search.html'
+    context_object_name = 'products'
+
+    def get_search_query(self):
+        return self.request.GET.get('q', '').strip()[:100]
+
+    def get_queryset(self):
+        query = self.get_search_query()
+        if not query:
+            return []
+        return catalog_cache.get_or_set(
+            f'search_{md5(query.lower().encode()).hexdigest()}',
+            lambda: search_products(query),
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super(SearchView, self).get_context_data(**kwargs)
+        context['title'] = 'поиск'
+        context['links_menu'] = get_links_menu()
+        context['query'] = self.get_search_query()
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.is_ajax():
+            return JsonResponse({
+                'query': context['query'],
+                'results': [{
+                    'pk': product.pk,
+                    'name': product.name,
+                    'short_desc': product.short_desc,
+                    'price': product.price,
+                    'url': reverse('products:product', args=[product.pk]),
+                } for product in context['products']],
+            })
+        return super(SearchView, self).render_to_response(context, **response_kwargs)
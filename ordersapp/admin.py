@@ -1,5 +1,20 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, OrderJob
+from .services import cancel_orders
+
+
+@admin.action(description='Отменить выбранные заказы и вернуть товар на склад')
+def cancel_selected(modeladmin, request, queryset):
+    stats = cancel_orders(queryset)
+    modeladmin.message_user(request, f'Отменено заказов: {stats["orders"]}, возвращено товаров: {stats["quantity"]}')
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'status', 'created', 'updated', 'is_active')
+    list_filter = ('status', 'is_active')
+    actions = (cancel_selected,)
+
 
-admin.site.register(Order)
 admin.site.register(OrderItem)
+admin.site.register(OrderJob)
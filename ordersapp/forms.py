@@ -1,9 +1,51 @@
 from django import forms
+from django.conf import settings
+from django.http import Http404
+from django.urls import reverse
+from django.utils.functional import cached_property
 
+from mainapp import cache as catalog_cache
 from mainapp.models import Product
+from mainapp.catalog import get_product
 from ordersapp.models import Order, OrderItem
 
 
+def get_product_choices():
+    """Варианты для выбора продукта - один запрос на версию каталога, общий для всех форм."""
+    return catalog_cache.get_or_set('order_product_choices', lambda: [('', '---------')] + [
+        (pk, f'{name} ({category})')
+        for pk, name, category in Product.get_items().values_list('pk', 'name', 'category__name')
+    ])
+
+
+def use_autocomplete():
+    """Большой каталог не встраивается в страницу: вместо select - поле с подсказками из JSON API."""
+    limit = settings.ORDER_PRODUCT_SELECT_LIMIT
+    if limit is None:
+        return False
+    return catalog_cache.get_or_set('order_product_count', lambda: Product.get_items().count()) > limit
+
+
+class ProductAutocompleteWidget(forms.Widget):
+    template_name = 'ordersapp/widgets/product_autocomplete.html'
+
+    def __init__(self, attrs=None, labels=None):
+        super().__init__(attrs)
+        # уже загруженные названия {pk: название}, чтобы не читать продукт повторно
+        self.labels = labels or {}
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        label = ''
+        if value:
+            try:
+                label = self.labels.get(int(value)) or str(get_product(value))
+            except (Http404, ValueError):
+                pass
+        context['widget'].update({'label': label, 'url': reverse('products:api_products')})
+        return context
+
+
 class OrderForm(forms.ModelForm):
     class Meta:
         model = Order
@@ -22,8 +64,35 @@ class OrderItemForm(forms.ModelForm):
         model = OrderItem
         exclude = ()
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, product_choices=None, autocomplete=False, **kwargs):
         super(OrderItemForm, self).__init__(*args, **kwargs)
         for field_name, field in self.fields.items():
             field.widget.attrs['class'] = 'form-control'
-        self.fields['product'].queryset = Product.get_items().select_related()
+        # queryset нужен только для проверки выбранного значения и не выполняется при выводе
+        self.fields['product'].queryset = Product.get_items()
+        if autocomplete:
+            labels = {}
+            if OrderItem.product.is_cached(self.instance):
+                labels[self.instance.product_id] = str(self.instance.product)
+            self.fields['product'].widget = ProductAutocompleteWidget(labels=labels)
+        else:
+            self.fields['product'].choices = get_product_choices() if product_choices is None else product_choices
+
+
+class OrderItemFormSet(forms.BaseInlineFormSet):
+    """Набор форм позиций: список продуктов строится один раз на весь набор, а не на каждую форму."""
+
+    @cached_property
+    def autocomplete(self):
+        return use_autocomplete()
+
+    @cached_property
+    def product_choices(self):
+        return get_product_choices()
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        kwargs['autocomplete'] = self.autocomplete
+        if not self.autocomplete:
+            kwargs['product_choices'] = self.product_choices
+        return kwargs
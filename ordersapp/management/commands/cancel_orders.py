@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from ordersapp.models import Order
+from ordersapp.services import cancel_orders, cancellable
+
+
+class Command(BaseCommand):
+    help = 'Отменяет заказы по фильтру и возвращает их позиции на склад сгруппированными UPDATE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', nargs='+', choices=[choice[0] for choice in Order.ORDER_STATUS_CHOICES],
+                            help='только заказы в этих статусах')
+        parser.add_argument('--older-than', type=int, help='не менявшиеся дольше стольких часов')
+        parser.add_argument('--user', type=int, help='id пользователя')
+        parser.add_argument('--ids', nargs='+', type=int, help='id заказов')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='только посчитать заказы')
+
+    def handle(self, *args, **options):
+        if all(options[name] is None for name in ('status', 'older_than', 'user', 'ids')):
+            raise CommandError('нужен хотя бы один фильтр: --status, --older-than, --user или --ids')
+        orders = Order.objects.all()
+        if options['status']:
+            orders = orders.filter(status__in=options['status'])
+        if options['older_than'] is not None:
+            orders = orders.filter(updated__lt=now() - timedelta(hours=options['older_than']))
+        if options['user'] is not None:
+            orders = orders.filter(user_id=options['user'])
+        if options['ids']:
+            orders = orders.filter(pk__in=options['ids'])
+
+        if options['dry_run']:
+            self.stdout.write(f'{cancellable(orders).count()} orders would be cancelled')
+            return
+        stats = cancel_orders(orders, batch_size=options['batch_size'], progress=lambda stats: self.stdout.write(
+            f'{stats["orders"]} orders, {stats["quantity"]} items restocked'))
+        self.stdout.write(self.style.SUCCESS(
+            f'cancelled {stats["orders"]} orders in {stats["batches"]} batches, '
+            f'{stats["quantity"]} items back in stock'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from ordersapp.processing import OrderWorkerPool, queue_stats
+
+
+class Command(BaseCommand):
+    help = 'Пул воркеров обработки заказов: забирает задания OrderJob и двигает заказы по статусам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='потоков, по умолчанию ORDER_QUEUE_WORKERS')
+        parser.add_argument('--batch-size', type=int, help='заданий за одну аренду, по умолчанию ORDER_QUEUE_BATCH_SIZE')
+        parser.add_argument('--visibility-timeout', type=int,
+                            help='секунд аренды, по умолчанию ORDER_QUEUE_VISIBILITY_TIMEOUT')
+        parser.add_argument('--max-attempts', type=int, help='по умолчанию ORDER_QUEUE_MAX_ATTEMPTS')
+        parser.add_argument('--drain', action='store_true', help='выйти, когда готовых заданий не останется')
+        parser.add_argument('--report-interval', type=int, default=10, help='секунд между выводом счетчиков')
+        parser.add_argument('--stats', action='store_true', help='только показать состояние очереди')
+
+    def format_queue(self):
+        stats = queue_stats()
+        return (f'queue: {stats["queued"]} queued, {stats["in_flight"]} in flight, {stats["done"]} done, '
+                f'{stats["failed"]} failed, lag {stats["lag"]}s')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(self.format_queue())
+            return
+        pool = OrderWorkerPool(
+            workers=options['workers'], batch_size=options['batch_size'],
+            visibility_timeout=options['visibility_timeout'], max_attempts=options['max_attempts'],
+            progress=lambda stats: self.stdout.write(
+                f'{stats["done"]} done, {stats["retried"]} retried, {stats["failed"]} failed, '
+                f'{stats["throughput"]} jobs/s; {self.format_queue()}'),
+        )
+        stats = pool.run(drain=options['drain'], report_interval=options['report_interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f'processed {stats["done"]} jobs ({stats["throughput"]} jobs/s), {stats["retried"]} retried, '
+            f'{stats["failed"]} failed, {stats["lost"]} lost lease'))
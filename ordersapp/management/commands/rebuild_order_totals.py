@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.core.management.base import BaseCommand
+
+from mainapp.models import Product
+from ordersapp.models import Order, OrderItem
+
+
+class Command(BaseCommand):
+    help = 'Заполняет цены позиций без снимка текущими ценами продуктов и пересчитывает итоги заказов'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            priced = OrderItem.objects.filter(price=0).update(
+                price=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1]))
+            orders = Order.update_totals()
+        self.stdout.write(f'order items priced: {priced}, order totals rebuilt: {orders}')
@@ -0,0 +1,17 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from ordersapp.models import CategorySalesDaily, ProductSalesDaily, SalesDaily
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает дневные итоги продаж по оплаченным заказам (после загрузки истории или правок в обход сигналов)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help='только начиная с этого дня, ГГГГ-ММ-ДД')
+
+    def handle(self, *args, **options):
+        SalesDaily.rebuild(since=options['since'])
+        self.stdout.write(f'sales rollups rebuilt: {ProductSalesDaily.objects.count()} product days, '
+                          f'{CategorySalesDaily.objects.count()} category days')
@@ -0,0 +1,61 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:40
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    """Пустые цены позиций - текущие цены продуктов, итоги заказов - как в Order.update_totals."""
+    Order = apps.get_model('ordersapp', 'Order')
+    OrderItem = apps.get_model('ordersapp', 'OrderItem')
+    Product = apps.get_model('mainapp', 'Product')
+
+    # уже заполненные цены не трогаем - это снимки на момент заказа
+    OrderItem.objects.filter(price=0).update(
+        price=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1]))
+
+    def aggregate(expression, output_field=models.IntegerField()):
+        return Coalesce(Subquery(
+            OrderItem.objects.filter(order_id=OuterRef('pk')).values('order_id')
+            .annotate(total=expression).values('total')
+        ), Value(0), output_field=output_field)
+
+    cost = DecimalField(max_digits=12, decimal_places=2)
+    Order.objects.update(
+        total_quantity=aggregate(Sum('quantity')),
+        total_cost=aggregate(Sum(ExpressionWrapper(F('quantity') * F('price'), output_field=cost)), cost),
+        product_type_quantity=aggregate(Count('pk')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0001_initial'),
+        ('ordersapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='product_type_quantity',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='позиций'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='стоимость'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_quantity',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='количество товаров'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=8, verbose_name='цена'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
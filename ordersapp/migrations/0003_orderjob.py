@@ -0,0 +1,42 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ordersapp', '0002_order_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Q', 'в очереди'), ('D', 'выполнено'), ('F', 'ошибка')], default='Q', max_length=1, verbose_name='статус')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='выполнить после')),
+                ('lease', models.CharField(blank=True, default='', max_length=32, verbose_name='аренда')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='занято до')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='попыток')),
+                ('last_error', models.TextField(blank=True, verbose_name='последняя ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='создано')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='завершено')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='ordersapp.order')),
+            ],
+            options={
+                'verbose_name': 'задание обработки заказа',
+                'verbose_name_plural': 'задания обработки заказов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='orderjob',
+            index=models.Index(fields=['status', 'run_at'], name='orderjob_status_run_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderjob',
+            index=models.Index(fields=['lease'], name='orderjob_lease_idx'),
+        ),
+    ]
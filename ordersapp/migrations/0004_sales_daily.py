@@ -0,0 +1,57 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ordersapp', '0003_orderjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='paid',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='оплачен'),
+        ),
+        migrations.CreateModel(
+            name='ProductSalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='день')),
+                ('quantity', models.IntegerField(default=0, verbose_name='количество')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='выручка')),
+                ('orders', models.IntegerField(default=0, verbose_name='заказов')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mainapp.product', verbose_name='продукт')),
+            ],
+            options={
+                'verbose_name': 'продажи продукта за день',
+                'verbose_name_plural': 'продажи продуктов по дням',
+            },
+        ),
+        migrations.CreateModel(
+            name='CategorySalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='день')),
+                ('quantity', models.IntegerField(default=0, verbose_name='количество')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='выручка')),
+                ('orders', models.IntegerField(default=0, verbose_name='заказов')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mainapp.productcategory', verbose_name='категория')),
+            ],
+            options={
+                'verbose_name': 'продажи категории за день',
+                'verbose_name_plural': 'продажи категорий по дням',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productsalesdaily',
+            constraint=models.UniqueConstraint(fields=('day', 'product'), name='product_sales_day_product_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='categorysalesdaily',
+            constraint=models.UniqueConstraint(fields=('day', 'category'), name='category_sales_day_category_uniq'),
+        ),
+    ]
@@ -1,7 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils.timezone import now
 
 from django.conf import settings
-from mainapp.models import Product
+from mainapp import inventory
+from mainapp.models import Product, ProductCategory, StockItemMixin, StockMovement
 
 
 # class OrderItemQuerySet(models.QuerySet):
@@ -36,6 +40,13 @@ class Order(models.Model):
                               choices=ORDER_STATUS_CHOICES,
                               default=FORMING)
     is_active = models.BooleanField(verbose_name='активен', default=True, db_index=True)
+    # итоги по позициям, пересчитываются update_totals при каждом изменении позиций
+    total_quantity = models.PositiveIntegerField(verbose_name='количество товаров', default=0, editable=False)
+    total_cost = models.DecimalField(verbose_name='стоимость', max_digits=12, decimal_places=2, default=0,
+                                     editable=False)
+    product_type_quantity = models.PositiveIntegerField(verbose_name='позиций', default=0, editable=False)
+    # время оплаты - по нему заказ попадает в дневные итоги продаж
+    paid = models.DateTimeField(verbose_name='оплачен', null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ('-created',)
@@ -46,41 +57,226 @@ class Order(models.Model):
         return 'Текущий заказ: {}'.format(self.id)
 
     def get_summary(self):
-        items = self.orderitems.select_related()
         return {
-            'total_cost': sum(list(map(lambda x: x.quantity * x.product.price, items))),
-            'total_quantity': sum(list(map(lambda x: x.quantity, items)))
+            'total_cost': self.total_cost,
+            'total_quantity': self.total_quantity,
         }
 
     def get_total_quantity(self):
-        items = self.orderitems.select_related()
-        return sum(list(map(lambda x: x.quantity, items)))
+        return self.total_quantity
 
     def get_product_type_quantity(self):
-        items = self.orderitems.select_related()
-        return len(items)
+        return self.product_type_quantity
 
     def get_total_cost(self):
-        items = self.orderitems.select_related()
-        return sum(list(map(lambda x: x.quantity * x.product.price, items)))
+        return self.total_cost
+
+    @staticmethod
+    def update_totals(order_ids=None):
+        """Пересчитывает итоги заказов одним UPDATE с подзапросами по позициям."""
+        def aggregate(expression, output_field=models.IntegerField()):
+            return Coalesce(Subquery(
+                OrderItem.objects.filter(order_id=OuterRef('pk')).values('order_id')
+                .annotate(total=expression).values('total')
+            ), Value(0), output_field=output_field)
+
+        cost = DecimalField(max_digits=12, decimal_places=2)
+
+        orders = Order.objects.all()
+        if order_ids is not None:
+            orders = orders.filter(pk__in=order_ids)
+        return orders.update(
+            total_quantity=aggregate(Sum('quantity')),
+            total_cost=aggregate(Sum(ExpressionWrapper(F('quantity') * F('price'), output_field=cost)), cost),
+            product_type_quantity=aggregate(Count('pk')),
+        )
 
     def delete(self):
-        for item in self.orderitems.select_related():
-            item.product.quantity += item.quantity
-            item.product.save()
-        self.is_active = False
-        self.save()
+        with transaction.atomic():
+            # экземпляр мог устареть (повторный вызов, старая форма) - состояние берем из базы под блокировкой
+            self.is_active, self.status = Order.objects.select_for_update() \
+                .filter(pk=self.pk).values_list('is_active', 'status').get()
+            # удаленный заказ уже вернул остаток, отмененный - еще и ушел из итогов продаж
+            if not self.is_active:
+                return
+            if self.status != Order.CANCEL:
+                deltas = {}
+                for product_id, quantity in self.orderitems.values_list('product_id', 'quantity'):
+                    deltas[product_id] = deltas.get(product_id, 0) + quantity
+                inventory.apply(deltas, StockMovement.ORDER, f'order:{self.pk}')
+                SalesDaily.apply([self.pk], -1)
+            self.is_active = False
+            # итоги в экземпляре могут быть устаревшими - пишем только свои поля
+            self.save(update_fields=['is_active', 'updated'])
 
 
-class OrderItem(models.Model):
+class OrderItem(StockItemMixin, models.Model):
     # objects = OrderItemQuerySet.as_manager()
     order = models.ForeignKey(Order, related_name="orderitems", on_delete=models.CASCADE)
     product = models.ForeignKey(Product, verbose_name='продукт', on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(verbose_name='количество', default=0)
+    # цена на момент добавления в заказ - итоги не меняются вместе с ценой продукта
+    price = models.DecimalField(verbose_name='цена', max_digits=8, decimal_places=2, default=0, editable=False)
 
     def get_product_cost(self):
-        return self.product.price * self.quantity
+        return self.price * self.quantity
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, 'loaded_stock', None)
+        if not self.pk or not self.price or (loaded and loaded[0] != self.product_id):
+            self.price = self.product.price
+        super().save(*args, **kwargs)
 
     @staticmethod
     def get_item(pk):
         return OrderItem.objects.get(pk=pk)
+
+
+class OrderJob(models.Model):
+    """Задание на следующий шаг обработки заказа, его забирает воркер process_orders."""
+    QUEUED = 'Q'
+    DONE = 'D'
+    FAILED = 'F'
+
+    JOB_STATUS_CHOICES = (
+        (QUEUED, 'в очереди'),
+        (DONE, 'выполнено'),
+        (FAILED, 'ошибка'),
+    )
+    order = models.ForeignKey(Order, related_name='jobs', on_delete=models.CASCADE)
+    status = models.CharField(verbose_name='статус', max_length=1, choices=JOB_STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(verbose_name='выполнить после', default=now)
+    # аренда: пока locked_until не прошло, задание принадлежит воркеру с токеном lease
+    lease = models.CharField(verbose_name='аренда', max_length=32, blank=True, default='')
+    locked_until = models.DateTimeField(verbose_name='занято до', null=True, blank=True)
+    attempts = models.PositiveIntegerField(verbose_name='попыток', default=0)
+    last_error = models.TextField(verbose_name='последняя ошибка', blank=True)
+    created = models.DateTimeField(verbose_name='создано', auto_now_add=True)
+    finished = models.DateTimeField(verbose_name='завершено', null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='orderjob_status_run_at_idx'),
+            models.Index(fields=['lease'], name='orderjob_lease_idx'),
+        ]
+        verbose_name = 'задание обработки заказа'
+        verbose_name_plural = 'задания обработки заказов'
+
+    def __str__(self):
+        return f'{self.order_id}: {self.get_status_display()}'
+
+
+class SalesDaily(models.Model):
+    """
+    Дневные итоги продаж: заказ добавляется в день оплаты и вычитается при отмене.
+    Отчеты читают только эти таблицы, а не позиции заказов.
+    """
+    day = models.DateField(verbose_name='день')
+    quantity = models.IntegerField(verbose_name='количество', default=0)
+    revenue = models.DecimalField(verbose_name='выручка', max_digits=14, decimal_places=2, default=0)
+    orders = models.IntegerField(verbose_name='заказов', default=0)
+
+    class Meta:
+        abstract = True
+
+    @staticmethod
+    def sold_items():
+        return OrderItem.objects.filter(order__paid__isnull=False, order__is_active=True) \
+            .exclude(order__status=Order.CANCEL)
+
+    @staticmethod
+    def item_rows(items):
+        """Позиции, сгруппированные по (заказ, продукт), с днем оплаты и категорией."""
+        return items.values('order_id', 'product_id', 'product__category_id', day=TruncDate('order__paid')) \
+            .annotate(quantity_sum=Sum('quantity'),
+                      revenue_sum=Sum(ExpressionWrapper(F('quantity') * F('price'),
+                                                        output_field=DecimalField(max_digits=14, decimal_places=2)))) \
+            .order_by()
+
+    @staticmethod
+    def apply(order_ids, sign=1):
+        """Добавляет (sign=1) или вычитает (sign=-1) оплаченные заказы из итогов."""
+        rows = SalesDaily.item_rows(OrderItem.objects.filter(order_id__in=order_ids, order__paid__isnull=False))
+        products, categories = {}, {}
+        for row in rows:
+            for totals, key in ((products, (row['day'], row['product_id'])),
+                                (categories, (row['day'], row['product__category_id']))):
+                quantity, revenue, orders = totals.get(key, (0, 0, set()))
+                totals[key] = (quantity + row['quantity_sum'], revenue + row['revenue_sum'], orders | {row['order_id']})
+        with transaction.atomic():
+            ProductSalesDaily.merge('product_id', products, sign)
+            CategorySalesDaily.merge('category_id', categories, sign)
+
+    @classmethod
+    def merge(cls, key_field, totals, sign):
+        if not totals:
+            return
+        existing = {
+            (row.day, getattr(row, key_field)): row
+            for row in cls.objects.select_for_update().filter(
+                day__in={day for day, key in totals}, **{f'{key_field}__in': {key for day, key in totals}})
+        }
+        changed, created = [], []
+        for (day, key), (quantity, revenue, orders) in totals.items():
+            row = existing.get((day, key))
+            if row is None:
+                row = cls(day=day, **{key_field: key})
+                created.append(row)
+            else:
+                changed.append(row)
+            row.quantity += sign * quantity
+            row.revenue += sign * revenue
+            row.orders += sign * len(orders)
+        # день, из которого ушли все заказы, удаляется - как после rebuild
+        empty = [row.pk for row in changed if row.orders <= 0]
+        cls.objects.filter(pk__in=empty).delete()
+        cls.objects.bulk_update([row for row in changed if row.orders > 0], ['quantity', 'revenue', 'orders'],
+                                batch_size=500)
+        cls.objects.bulk_create(created, batch_size=500)
+
+    @staticmethod
+    def rebuild(since=None):
+        """Пересчитывает итоги с нуля (или начиная с дня since) одним агрегатом на таблицу."""
+        items = SalesDaily.sold_items()
+        products, categories = ProductSalesDaily.objects.all(), CategorySalesDaily.objects.all()
+        if since is not None:
+            items = items.filter(order__paid__date__gte=since)
+            products, categories = products.filter(day__gte=since), categories.filter(day__gte=since)
+        revenue = Sum(ExpressionWrapper(F('quantity') * F('price'),
+                                        output_field=DecimalField(max_digits=14, decimal_places=2)))
+        with transaction.atomic():
+            products.delete()
+            categories.delete()
+            for model, key_field, group_by in ((ProductSalesDaily, 'product_id', 'product_id'),
+                                               (CategorySalesDaily, 'category_id', 'product__category_id')):
+                rows = items.values(group_by, day=TruncDate('order__paid')).annotate(
+                    quantity_sum=Sum('quantity'), revenue_sum=revenue,
+                    orders_count=Count('order_id', distinct=True)).order_by()
+                model.objects.bulk_create([
+                    model(day=row['day'], quantity=row['quantity_sum'], revenue=row['revenue_sum'],
+                          orders=row['orders_count'], **{key_field: row[group_by]})
+                    for row in rows
+                ], batch_size=1000)
+
+
+class ProductSalesDaily(SalesDaily):
+    product = models.ForeignKey(Product, verbose_name='продукт', on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='product_sales_day_product_uniq'),
+        ]
+        verbose_name = 'продажи продукта за день'
+        verbose_name_plural = 'продажи продуктов по дням'
+
+
+class CategorySalesDaily(SalesDaily):
+    category = models.ForeignKey(ProductCategory, verbose_name='категория', on_delete=models.CASCADE,
+                                 related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category'], name='category_sales_day_category_uniq'),
+        ]
+        verbose_name = 'продажи категории за день'
+        verbose_name_plural = 'продажи категорий по дням'
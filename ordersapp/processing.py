@@ -0,0 +1,199 @@
+"""
+Очередь обработки заказов в таблице OrderJob. Воркер забирает пачку заданий
+одним UPDATE с токеном аренды - без SELECT ... FOR UPDATE, поэтому работает и
+на SQLite. Заказ сдвигается на один шаг в своей транзакции, следующий шаг -
+новое задание. Ошибка - повтор с экспоненциальной задержкой; задание упавшего
+воркера снова доступно, когда истекает аренда. Работа шага - обработчик из
+ORDER_STEP_HANDLERS - идет вне транзакции, в транзакции - только смена статуса
+и завершение задания. Обработчик должен выдерживать повтор: если аренда истечет,
+шаг выполнит другой воркер.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+from ordersapp.models import Order, OrderJob, SalesDaily
+
+# статус заказа -> следующий статус; READY и CANCEL - конечные
+STEPS = {
+    Order.SENT_TO_PROCEED: Order.PROCEEDED,
+    Order.PROCEEDED: Order.PAID,
+    Order.PAID: Order.READY,
+}
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def enqueue(order_ids, run_at=None):
+    OrderJob.objects.bulk_create([OrderJob(order_id=pk, run_at=run_at or now()) for pk in order_ids])
+
+
+def get_handler(status):
+    path = settings.ORDER_STEP_HANDLERS.get(status)
+    return import_string(path) if path else None
+
+
+def perform(order):
+    """
+    Вызывает обработчик шага из ORDER_STEP_HANDLERS (оплата, сборка, уведомления),
+    если он задан для текущего статуса; без обработчика шаг - только смена статуса.
+    """
+    handler = get_handler(order.status)
+    if handler is not None:
+        handler(order)
+
+
+def advance(order):
+    """Сдвигает статус заказа на один шаг - короткая запись в транзакции process()."""
+    order.status = STEPS[order.status]
+    if order.status != Order.PAID:
+        order.save(update_fields=['status', 'updated'])
+        return
+    order.paid = now()
+    order.save(update_fields=['status', 'paid', 'updated'])
+    SalesDaily.apply([order.pk])
+
+
+def available(at):
+    return Q(status=OrderJob.QUEUED, run_at__lte=at) & (Q(locked_until__isnull=True) | Q(locked_until__lt=at))
+
+
+def claim(batch_size, visibility_timeout):
+    """Берет в аренду до batch_size готовых заданий одним UPDATE; параллельный воркер их уже не получит."""
+    at, lease = now(), uuid4().hex
+    candidates = OrderJob.objects.filter(available(at)).order_by('run_at').values('pk')[:batch_size]
+    # условие повторяется снаружи: строку, которую успел забрать другой воркер, UPDATE пропустит
+    claimed = OrderJob.objects.filter(available(at), pk__in=candidates).update(
+        lease=lease,
+        locked_until=at + timedelta(seconds=visibility_timeout),
+        attempts=F('attempts') + 1,
+    )
+    if not claimed:
+        return []
+    return list(OrderJob.objects.filter(lease=lease).order_by('run_at'))
+
+
+def retry_delay(attempts):
+    return min(settings.ORDER_QUEUE_RETRY_DELAY * 2 ** (attempts - 1), settings.ORDER_QUEUE_MAX_RETRY_DELAY)
+
+
+def process(job, max_attempts):
+    """Выполняет задание; возвращает 'done', 'retried', 'failed' или 'lost' (аренда истекла)."""
+    try:
+        order = Order.objects.get(pk=job.order_id)
+        status = order.status
+        if order.is_active and status in STEPS:
+            perform(order)
+        with transaction.atomic():
+            # завершаем, только если аренда еще наша. Запись идет первой: на SQLite транзакция
+            # сразу берет блокировку на запись, а не упирается в "database is locked" после чтения
+            if not OrderJob.objects.filter(pk=job.pk, lease=job.lease).update(
+                    status=OrderJob.DONE, finished=now(), locked_until=None):
+                raise LeaseLost(job.pk)
+            order = Order.objects.select_for_update().get(pk=job.order_id)
+            # пока шел шаг, заказ могли отменить или сдвинуть - тогда статус не трогаем
+            if order.is_active and order.status == status and status in STEPS:
+                advance(order)
+                if order.status in STEPS:
+                    enqueue([order.pk])
+    except LeaseLost:
+        return 'lost'
+    except Exception as error:
+        failed = job.attempts >= max_attempts
+        OrderJob.objects.filter(pk=job.pk, lease=job.lease).update(
+            status=OrderJob.FAILED if failed else OrderJob.QUEUED,
+            run_at=now() + timedelta(seconds=retry_delay(job.attempts)),
+            locked_until=None,
+            last_error=f'{type(error).__name__}: {error}',
+            finished=now() if failed else None,
+        )
+        return 'failed' if failed else 'retried'
+    return 'done'
+
+
+def queue_stats():
+    """Размер очереди по статусам, сколько заданий в работе и отставание самого старого готового задания."""
+    at = now()
+    counts = dict(OrderJob.objects.values('status').annotate(total=Count('pk')).order_by()
+                  .values_list('status', 'total'))
+    oldest = OrderJob.objects.filter(available(at)).aggregate(oldest=Min('run_at'))['oldest']
+    return {
+        'queued': counts.get(OrderJob.QUEUED, 0),
+        'done': counts.get(OrderJob.DONE, 0),
+        'failed': counts.get(OrderJob.FAILED, 0),
+        'in_flight': OrderJob.objects.filter(status=OrderJob.QUEUED, locked_until__gte=at).count(),
+        'lag': round((at - oldest).total_seconds(), 3) if oldest else 0,
+    }
+
+
+class OrderWorkerPool:
+    """
+    Пул потоков-воркеров: каждый в цикле берет пачку заданий и выполняет их
+    по одному. Масштабируется числом потоков или запуском нескольких команд.
+    """
+
+    def __init__(self, workers=None, batch_size=None, visibility_timeout=None, max_attempts=None,
+                 poll_interval=None, progress=None):
+        self.workers = workers or settings.ORDER_QUEUE_WORKERS
+        self.batch_size = batch_size or settings.ORDER_QUEUE_BATCH_SIZE
+        self.visibility_timeout = visibility_timeout or settings.ORDER_QUEUE_VISIBILITY_TIMEOUT
+        self.max_attempts = max_attempts or settings.ORDER_QUEUE_MAX_ATTEMPTS
+        self.poll_interval = settings.ORDER_QUEUE_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.progress = progress or (lambda stats: None)
+        self.stats = {'done': 0, 'retried': 0, 'failed': 0, 'lost': 0}
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.started = None
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        elapsed = time.monotonic() - self.started if self.started else 0
+        stats['throughput'] = round(stats['done'] / elapsed, 1) if elapsed else 0
+        return stats
+
+    def work(self, drain):
+        try:
+            while not self.stop.is_set():
+                jobs = claim(self.batch_size, self.visibility_timeout)
+                if not jobs:
+                    if drain:
+                        break
+                    self.stop.wait(self.poll_interval)
+                    continue
+                for job in jobs:
+                    result = process(job, self.max_attempts)
+                    with self.lock:
+                        self.stats[result] += 1
+        finally:
+            # у каждого потока свое соединение с базой
+            connection.close()
+
+    def run(self, drain=False, report_interval=10):
+        """drain=True - выйти, когда готовых заданий не останется; иначе работать до остановки."""
+        self.started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self.work, drain) for _ in range(self.workers)]
+            reported = time.monotonic()
+            try:
+                while not all(future.done() for future in futures):
+                    time.sleep(0.1)
+                    if time.monotonic() - reported >= report_interval:
+                        reported = time.monotonic()
+                        self.progress(self.get_stats())
+            except KeyboardInterrupt:
+                self.stop.set()
+            for future in futures:
+                future.result()
+        return self.get_stats()
@@ -0,0 +1,83 @@
+"""
+Оформление заказа из корзины одной транзакцией: позиции заказа - одним
+bulk_create, корзина - одним DELETE. Остаток уже списан под корзину, поэтому
+склад не меняется: в журнал пишется перенос резерва с корзины на заказ.
+Число запросов не зависит от размера корзины.
+
+Массовая отмена заказов - пачками: на пачку один UPDATE статуса и один
+UPDATE остатков с суммой по каждому продукту, без сохранения продуктов по одному;
+оплаченные заказы вычитаются из итогов продаж.
+"""
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils.timezone import now
+
+from basketapp.models import Basket, BasketSummary
+from mainapp import inventory
+from mainapp.models import StockMovement
+from ordersapp.models import Order, OrderItem, SalesDaily
+
+
+def checkout(user):
+    """Переносит корзину пользователя в новый заказ; пустая корзина - None."""
+    with transaction.atomic():
+        rows = list(Basket.objects.select_for_update().filter(user=user)
+                    .values_list('pk', 'product_id', 'quantity', 'product__price'))
+        if not rows:
+            return None
+
+        quantities = {}
+        for pk, product_id, quantity, price in rows:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        order = Order.objects.create(
+            user=user,
+            total_quantity=sum(row[2] for row in rows),
+            total_cost=sum(row[2] * row[3] for row in rows),
+            product_type_quantity=len(rows),
+        )
+        # bulk_create не шлет pre_save - остаток не списывается второй раз
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=product_id, quantity=quantity, price=price)
+            for pk, product_id, quantity, price in rows
+        ], batch_size=500)
+        inventory.record(quantities, StockMovement.BASKET, f'user:{user.pk}')
+        inventory.record({pk: -quantity for pk, quantity in quantities.items()},
+                         StockMovement.ORDER, f'order:{order.pk}')
+        Basket.objects.filter(pk__in=[row[0] for row in rows]).delete_rows()
+        BasketSummary.objects.filter(user=user).update(items=0, quantity=0, cost=0)
+    return order
+
+
+def cancellable(orders):
+    # удаленные заказы уже вернули остаток в Order.delete
+    return orders.filter(is_active=True).exclude(status=Order.CANCEL)
+
+
+def cancel_orders(orders, batch_size=500, progress=None):
+    """
+    Отменяет заказы из queryset orders и возвращает их позиции на склад.
+    Каждая пачка - своя транзакция; возвращает {'orders', 'quantity', 'batches'}.
+    """
+    stats = {'orders': 0, 'quantity': 0, 'batches': 0}
+    order_ids = list(cancellable(orders).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(order_ids), batch_size):
+        with transaction.atomic():
+            # заказ мог измениться после выборки id - перечитываем под блокировкой
+            batch = list(cancellable(Order.objects.select_for_update())
+                         .filter(pk__in=order_ids[start:start + batch_size]).values_list('pk', flat=True))
+            if not batch:
+                continue
+            items = OrderItem.objects.filter(order_id__in=batch).values('order_id', 'product_id') \
+                .annotate(total=Sum('quantity')).order_by()
+            entries = [(row['product_id'], row['total'], f'order:{row["order_id"]}') for row in items]
+            inventory.apply_entries(entries, StockMovement.CANCEL)
+            SalesDaily.apply(batch, -1)
+            Order.objects.filter(pk__in=batch).update(status=Order.CANCEL, updated=now())
+
+        stats['orders'] += len(batch)
+        stats['quantity'] += sum(entry[1] for entry in entries)
+        stats['batches'] += 1
+        if progress:
+            progress(stats)
+    return stats
@@ -0,0 +1,22 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from mainapp import inventory
+from mainapp.models import StockMovement
+from ordersapp.models import Order, OrderItem
+
+
+@receiver(pre_save, sender=OrderItem)
+def order_item_stock_save(sender, instance, **kwargs):
+    inventory.item_saved(instance, StockMovement.ORDER, f'order:{instance.order_id}')
+
+
+@receiver(post_delete, sender=OrderItem)
+def order_item_stock_delete(sender, instance, **kwargs):
+    inventory.item_deleted(instance, StockMovement.ORDER, f'order:{instance.order_id}')
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_totals(sender, instance, **kwargs):
+    Order.update_totals([instance.order_id])
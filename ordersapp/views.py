@@ -1,21 +1,24 @@
 from django.contrib.auth.decorators import login_required
-from django.dispatch import receiver
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, HttpResponseRedirect
 from django.urls import reverse, reverse_lazy
 from django.db import transaction
-from django.db.models.signals import pre_save, pre_delete
+from django.db.models import Prefetch
 
 from django.forms import inlineformset_factory
 from django.utils.decorators import method_decorator
 
+from django.views.decorators.http import condition, require_GET, require_POST
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.views.generic.detail import DetailView
 
-from basketapp.models import Basket
+from mainapp import cache as catalog_cache
+from mainapp.api import ApiError, api_response, catalog_etag, parse_ids
+from mainapp.inventory import OutOfStock
 from mainapp.models import Product
+from ordersapp import processing, services
 from ordersapp.models import Order, OrderItem
-from ordersapp.forms import OrderItemForm
+from ordersapp.forms import OrderItemForm, OrderItemFormSet
 
 
 class FormValidMixin:
@@ -23,19 +26,37 @@ class FormValidMixin:
     def form_valid(self, form):
         context = self.get_context_data()
         orderitems = context['orderitems']
-
-        with transaction.atomic():
-            assert isinstance(self.request.user, object)
-            form.instance.user = self.request.user
-            self.object = form.save()
-            if orderitems.is_valid():
-                orderitems.instance = self.object
-                orderitems.save()
+        created = form.instance.pk is None
+
+        try:
+            with transaction.atomic():
+                assert isinstance(self.request.user, object)
+                form.instance.user = self.request.user
+                self.object = form.save()
+                if orderitems.is_valid():
+                    orderitems.instance = self.object
+                    orderitems.save()
+                # итоги пересчитаны сигналами позиций в базе
+                self.object.refresh_from_db(fields=['total_quantity', 'total_cost', 'product_type_quantity'])
+        except OutOfStock as error:
+            # транзакция откатилась целиком - возвращаем форму с ошибкой у строк без остатка
+            if created:
+                self.object = None
+            return self.stock_invalid(form, orderitems, set(error.args[0]))
 
         if self.object.get_total_cost() == 0:
             self.object.delete()
         return super().form_valid(form)
 
+    def stock_invalid(self, form, orderitems, product_ids):
+        for item_form in orderitems.forms:
+            product = item_form.cleaned_data.get('product')
+            if product is not None and product.pk in product_ids:
+                item_form.add_error('quantity', 'Недостаточно товара на складе')
+        context = self.get_context_data(form=form)
+        context['orderitems'] = orderitems
+        return self.render_to_response(context)
+
 
 class DispatchMixin:
     @method_decorator(login_required())
@@ -43,12 +64,20 @@ class DispatchMixin:
         return super().dispatch(*args, **kwargs)
 
 
+class FormingOrderMixin:
+    def get_queryset(self):
+        # менять и удалять можно только свой формируемый заказ: у отмененного или
+        # переданного в обработку позиции больше не должны трогать остаток
+        return Order.objects.filter(user=self.request.user, status=Order.FORMING, is_active=True)
+
+
 class OrderList(DispatchMixin, FormValidMixin, ListView):
     model = Order
     extra_context = {'title': 'Список заказов'}
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        # итоги хранятся в самом заказе - список без запросов на каждую строку
+        return Order.objects.filter(user=self.request.user, is_active=True)
 
 
 class OrderCreate(DispatchMixin, FormValidMixin, CreateView):
@@ -59,27 +88,13 @@ class OrderCreate(DispatchMixin, FormValidMixin, CreateView):
 
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
-        OrderFormSet = inlineformset_factory(Order, OrderItem, form=OrderItemForm, extra=1)
+        OrderFormSet = inlineformset_factory(Order, OrderItem, form=OrderItemForm, formset=OrderItemFormSet, extra=1)
 
         if self.request.POST:
             formset = OrderFormSet(self.request.POST)
         else:
-            basket_items = Basket.objects.filter(user=self.request.user)
-            if len(basket_items):
-                OrderFormSet = inlineformset_factory(
-                    Order,
-                    OrderItem,
-                    form=OrderItemForm,
-                    extra=len(basket_items) + 1)
-                formset = OrderFormSet()
-                for num, form in enumerate(formset.forms):
-                    if num < len(basket_items):
-                        form.initial['product'] = basket_items[num].product
-                        form.initial['quantity'] = basket_items[num].quantity
-                        form.initial['price'] = basket_items[num].product.price
-                basket_items.delete()
-            else:
-                formset = OrderFormSet()
+            # заказ из корзины оформляется через checkout, здесь - пустой заказ
+            formset = OrderFormSet()
 
         data['orderitems'] = formset
         return data
@@ -89,8 +104,12 @@ class OrderRead(DispatchMixin, DetailView):
     model = Order
     extra_context = {'title': 'Просмотр заказа'}
 
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user).prefetch_related(
+            Prefetch('orderitems', queryset=OrderItem.objects.select_related('product__category')))
+
 
-class OrderUpdate(DispatchMixin, FormValidMixin, UpdateView):
+class OrderUpdate(DispatchMixin, FormingOrderMixin, FormValidMixin, UpdateView):
     model = Order
     fields = []
     success_url = reverse_lazy('order:list')
@@ -98,7 +117,7 @@ class OrderUpdate(DispatchMixin, FormValidMixin, UpdateView):
 
     def get_context_data(self, **kwargs):
         data = super().get_context_data(**kwargs)
-        OrderFormSet = inlineformset_factory(Order, OrderItem, form=OrderItemForm, extra=1)
+        OrderFormSet = inlineformset_factory(Order, OrderItem, form=OrderItemForm, formset=OrderItemFormSet, extra=1)
 
         if self.request.POST:
             formset = OrderFormSet(self.request.POST, instance=self.object)
@@ -108,48 +127,55 @@ class OrderUpdate(DispatchMixin, FormValidMixin, UpdateView):
             formset = OrderFormSet(instance=self.object, queryset=queryset)
             for form in formset.forms:
                 if form.instance.pk:
-                    form.initial['price'] = form.instance.product.price
+                    form.initial['price'] = form.instance.price
 
         data['orderitems'] = formset
         return data
 
 
-class OrderDelete(DispatchMixin, DeleteView):
+class OrderDelete(DispatchMixin, FormingOrderMixin, DeleteView):
     model = Order
     success_url = reverse_lazy('order:list')
     extra_context = {'title': 'Удаление заказа'}
 
 
+@login_required
+@require_POST
+def checkout(request):
+    order = services.checkout(request.user)
+    if order is None:
+        return HttpResponseRedirect(reverse('order:list'))
+    return HttpResponseRedirect(reverse('order:update', args=[order.pk]))
+
+
+@login_required
 def forming_complete(request, pk):
-    order = get_object_or_404(Order, pk=pk)
-    order.status = Order.SENT_TO_PROCEED
-    order.save()
+    with transaction.atomic():
+        order = get_object_or_404(Order.objects.select_for_update(), pk=pk, user=request.user)
+        if order.status == Order.FORMING:
+            order.status = Order.SENT_TO_PROCEED
+            order.save(update_fields=['status', 'updated'])
+            # дальше заказ ведет process_orders, вне запроса
+            processing.enqueue([order.pk])
 
     return HttpResponseRedirect(reverse('order:list'))
 
 
-@receiver(pre_save, sender=Basket)
-@receiver(pre_save, sender=OrderItem)
-def product_quantity_update_save(sender, update_fields, instance, **kwargs):
-    if instance.pk:
-        instance.product.quantity -= instance.quantity - sender.get_item(instance.pk).quantity
-    else:
-        instance.product.quantity -= instance.quantity
-    instance.product.save()
+def get_product_price(request, pk):
+    if request.is_ajax():
+        price = Product.objects.filter(pk=pk).values_list('price', flat=True).first()
+        return JsonResponse({'price': price or 0})
 
 
-@receiver(pre_delete, sender=OrderItem)
-@receiver(pre_delete, sender=Basket)
-def product_quantity_update_delete(sender, instance, **kwargs):
-    instance.product.quantity += instance.quantity
-    instance.product.save()
+def get_prices_payload(request):
+    ids = parse_ids(request)
+    if not ids:
+        raise ApiError('ids required')
+    return {'prices': {str(pk): price for pk, price in Product.objects.filter(pk__in=ids).values_list('pk', 'price')}}
 
 
-def get_product_price(request, pk):
-    if request.is_ajax():
-        product = Product.objects.filter(pk=pk).first()
-        print(product)
-        if product:
-            return JsonResponse({'price': product.price})
-        else:
-            return JsonResponse({'price': 0})
+@require_GET
+@condition(etag_func=catalog_etag(lambda request: (catalog_cache.PRODUCT,)))
+def get_product_prices(request):
+    """Цены нескольких продуктов одним запросом: ?ids=1,2,3 -> {"prices": {"1": "10.00", ...}}."""
+    return api_response(request, (catalog_cache.PRODUCT,), get_prices_payload)
@@ -0,0 +1,422 @@
+import gc
+import json
+import platform
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+from statistics import mean
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+
+from authapp.models import ShopUser, ShopUserProfile
+from basketapp import services as basket_services
+from basketapp.models import Basket, BasketSummary
+from mainapp import inventory
+from mainapp.importer import CatalogImporter
+from mainapp.models import Product, ProductCategory, StockMovement
+from ordersapp.models import Order, OrderItem, SalesDaily
+
+BENCH_PREFIX = 'bench'
+BENCH_PASSWORD = 'bench'
+WORDS = ('ring', 'lamp', 'chair', 'sofa', 'table', 'shelf', 'vase', 'clock', 'mirror', 'rug',
+         'белый', 'дубовый', 'мягкий', 'угловой', 'складной', 'классический', 'модерн', 'лофт')
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class DataGenerator:
+    """
+    Синтетические данные для бенчмарка. Одинаковый seed дает одинаковые данные,
+    категории и продукты пишутся через импортер (upsert), поэтому повторный запуск
+    не плодит дубликаты каталога.
+    """
+
+    def __init__(self, seed=0, batch_size=1000, progress=None):
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.progress = progress or (lambda message: None)
+
+    def words(self, count):
+        return ' '.join(self.random.choice(WORDS) for _ in range(count))
+
+    def generate(self, categories, products, users, baskets, orders):
+        self.catalog(categories, products)
+        user_ids = self.users(users)
+        product_ids = list(Product.objects.filter(is_active=True, name__startswith=BENCH_PREFIX)
+                           .values_list('pk', flat=True))
+        self.baskets(user_ids, product_ids, baskets)
+        self.orders(user_ids, product_ids, orders)
+
+    def catalog(self, categories, products):
+        category_names = [f'{BENCH_PREFIX} category {num}' for num in range(categories)]
+        importer = CatalogImporter(batch_size=self.batch_size)
+        importer.import_categories({'name': name, 'description': self.words(8)} for name in category_names)
+        importer.import_products({
+            'category': self.random.choice(category_names),
+            'name': f'{BENCH_PREFIX} product {num} {self.words(2)}',
+            'short_desc': self.words(4),
+            'description': self.words(30),
+            'price': Decimal(self.random.randint(100, 5000000)) / 100,
+            'quantity': self.random.randint(0, 500),
+            'is_active': self.random.random() > 0.05,
+        } for num in range(products))
+        importer.finish()
+        self.progress(f'catalog: {importer.stats}')
+
+    def users(self, count):
+        # хеш пароля считаем один раз - иначе генерация упрется в pbkdf2
+        password = make_password(BENCH_PASSWORD)
+        usernames = [f'{BENCH_PREFIX}_user_{num}' for num in range(count)]
+        existing = set(ShopUser.objects.filter(username__in=usernames).values_list('username', flat=True))
+        for batch in chunks((name for name in usernames if name not in existing), self.batch_size):
+            with transaction.atomic():
+                ShopUser.objects.bulk_create([
+                    ShopUser(username=name, password=password, email=f'{name}@shop.local',
+                             age=self.random.randint(18, 80)).fill_lowercase() for name in batch
+                ])
+                # bulk_create не шлет post_save, профили создаем сами
+                ShopUserProfile.objects.bulk_create([
+                    ShopUserProfile(user_id=pk)
+                    for pk in ShopUser.objects.filter(username__in=batch).values_list('pk', flat=True)
+                ])
+        self.progress(f'users: {count - len(existing)} created')
+        return list(ShopUser.objects.filter(username__in=usernames).values_list('pk', flat=True))
+
+    @staticmethod
+    def stock(product_ids):
+        return dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'quantity'))
+
+    def take(self, stock, product_id, quantity):
+        """Резервирует quantity из локального остатка; продукта не хватает - позиция пропускается."""
+        if stock.get(product_id, 0) < quantity:
+            return False
+        stock[product_id] -= quantity
+        return True
+
+    def baskets(self, user_ids, product_ids, count):
+        """
+        Позиции корзин с тем же списанием остатка и журналом, что и basket_add,
+        и со сводками BasketSummary - иначе reaper вернет на склад то, что не списывалось.
+        """
+        if not user_ids or not product_ids:
+            return
+        pairs = set(Basket.objects.filter(user_id__in=user_ids).values_list('user_id', 'product_id'))
+        stock = self.stock(product_ids)
+        created = 0
+        for batch in chunks(range(count), self.batch_size):
+            items = []
+            for _ in batch:
+                pair = (self.random.choice(user_ids), self.random.choice(product_ids))
+                quantity = self.random.randint(1, 3)
+                if pair not in pairs and self.take(stock, pair[1], quantity):
+                    pairs.add(pair)
+                    items.append(Basket(user_id=pair[0], product_id=pair[1], quantity=quantity))
+            with transaction.atomic():
+                Basket.objects.bulk_create(items, batch_size=self.batch_size)
+                inventory.apply_entries([(item.product_id, -item.quantity, f'user:{item.user_id}') for item in items],
+                                        StockMovement.BASKET)
+                BasketSummary.rebuild({item.user_id for item in items})
+            created += len(items)
+        self.progress(f'baskets: {created} created')
+
+    def orders(self, user_ids, product_ids, count):
+        """
+        Заказы с ценами позиций, итогами и списанием остатка. Оплаченным заказам
+        ставится время оплаты и они попадают в дневные итоги продаж; отмененные
+        остаток не держат.
+        """
+        if not user_ids or not product_ids:
+            return
+        statuses = [status for status, _ in Order.ORDER_STATUS_CHOICES]
+        prices = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'price'))
+        stock = self.stock(product_ids)
+        for batch in chunks(range(count), self.batch_size):
+            with transaction.atomic():
+                last_pk = Order.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+                orders = []
+                for _ in batch:
+                    status = self.random.choice(statuses)
+                    paid = None
+                    if status in (Order.PAID, Order.READY):
+                        paid = now() - timedelta(days=self.random.randint(0, 90), seconds=self.random.randint(0, 86399))
+                    orders.append(Order(user_id=self.random.choice(user_ids), status=status, paid=paid))
+                Order.objects.bulk_create(orders)
+                items, entries = [], []
+                for order_pk, status in Order.objects.filter(pk__gt=last_pk).values_list('pk', 'status'):
+                    for product_pk in self.random.sample(product_ids, min(len(product_ids), self.random.randint(1, 5))):
+                        quantity = self.random.randint(1, 5)
+                        if status != Order.CANCEL:
+                            if not self.take(stock, product_pk, quantity):
+                                continue
+                            entries.append((product_pk, -quantity, f'order:{order_pk}'))
+                        items.append(OrderItem(order_id=order_pk, product_id=product_pk, quantity=quantity,
+                                               price=prices[product_pk]))
+                OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+                inventory.apply_entries(entries, StockMovement.ORDER)
+                order_ids = list(Order.objects.filter(pk__gt=last_pk).values_list('pk', flat=True))
+                Order.update_totals(order_ids)
+                SalesDaily.apply(order_ids)
+        self.progress(f'orders: {count} created')
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    if not values:
+        return None
+    index = (len(values) - 1) * percent / 100
+    lower = int(index)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (index - lower)
+
+
+class Endpoint:
+    """
+    Описание запроса бенчмарка. request(context) возвращает (path, data) для
+    очередной итерации - он вызывается до замера времени.
+    """
+
+    def __init__(self, name, request, method='get', user=None, ajax=False, status=(200, 302), json=False):
+        self.name = name
+        self.request = request
+        self.method = method
+        self.user = user
+        self.ajax = ajax
+        self.status = status
+        self.json = json
+
+
+class BenchContext:
+    """Случайные, но воспроизводимые id для запросов бенчмарка."""
+
+    def __init__(self, seed=0, sample_size=1000):
+        self.random = random.Random(seed)
+        self.user = (ShopUser.objects.filter(username__startswith=f'{BENCH_PREFIX}_user_', is_active=True)
+                     .order_by('pk').first())
+        self.admin = ShopUser.objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+        product_ids = list(Product.objects.filter(is_active=True, category__is_active=True)
+                           .order_by('pk').values_list('pk', flat=True))
+        self.product_ids = self.random.sample(product_ids, min(sample_size, len(product_ids)))
+        # для корзины и заказов - только товары с остатком, иначе меряем ошибки, а не вьюхи
+        self.stock_product_ids = list(Product.objects.filter(pk__in=self.product_ids, quantity__gt=0)
+                                      .values_list('pk', flat=True)) or self.product_ids
+        self.category_ids = list(ProductCategory.objects.filter(is_active=True).values_list('pk', flat=True))
+        words = Product.objects.filter(pk__in=self.product_ids[:50]).values_list('name', flat=True)
+        self.search_words = [word for name in words for word in name.split() if len(word) > 3] or ['product']
+
+    def product(self):
+        return self.random.choice(self.product_ids)
+
+    def stock_product(self):
+        return self.random.choice(self.stock_product_ids)
+
+    def category(self):
+        return self.random.choice(self.category_ids)
+
+    def basket_item(self):
+        # правка ставит количество до 3 - берем позицию, которой хватит остатка, иначе меряем 409
+        pk = (Basket.objects.filter(user=self.user, product__quantity__gte=3).order_by('?')
+              .values_list('pk', flat=True).first())
+        if pk is None:
+            pk = Basket.objects.create(user=self.user, product_id=self.stock_product(), quantity=1).pk
+        return pk
+
+    def order(self):
+        pk = (Order.objects.filter(user=self.user, is_active=True, status=Order.FORMING)
+              .order_by('-pk').values_list('pk', flat=True).first())
+        if pk is None:
+            order = Order.objects.create(user=self.user)
+            OrderItem.objects.create(order=order, product_id=self.stock_product(), quantity=1)
+            pk = order.pk
+        return pk
+
+    def order_create_data(self):
+        data = {
+            'orderitems-TOTAL_FORMS': '1', 'orderitems-INITIAL_FORMS': '0',
+            'orderitems-MIN_NUM_FORMS': '0', 'orderitems-MAX_NUM_FORMS': '1000',
+            'orderitems-0-product': str(self.stock_product()), 'orderitems-0-quantity': '1',
+        }
+        return reverse('order:create'), data
+
+    def checkout_data(self, items=20):
+        # корзина наполняется до таймера - меряется только перенос в заказ
+        for product_id in self.random.sample(self.stock_product_ids, min(items, len(self.stock_product_ids))):
+            try:
+                basket_services.add(self.user, product_id)
+            except basket_services.OutOfStock:
+                continue
+        return reverse('order:checkout'), {}
+
+    def order_update_data(self):
+        pk = self.order()
+        items = list(OrderItem.objects.filter(order_id=pk).values_list('pk', 'product_id', 'quantity'))
+        data = {
+            'orderitems-TOTAL_FORMS': str(len(items)), 'orderitems-INITIAL_FORMS': str(len(items)),
+            'orderitems-MIN_NUM_FORMS': '0', 'orderitems-MAX_NUM_FORMS': '1000',
+        }
+        for num, (item_pk, product_pk, quantity) in enumerate(items):
+            data.update({
+                f'orderitems-{num}-id': str(item_pk), f'orderitems-{num}-order': str(pk),
+                f'orderitems-{num}-product': str(product_pk), f'orderitems-{num}-quantity': str(quantity),
+            })
+        return reverse('order:update', args=[pk]), data
+
+
+def get_endpoints():
+    """Все маршруты shop/urls.py, которые можно гонять в цикле без ручного ввода."""
+    def url(name, *args):
+        return lambda ctx: (reverse(name, args=[arg(ctx) if callable(arg) else arg for arg in args]), None)
+
+    product = BenchContext.product
+    category = BenchContext.category
+    return [
+        Endpoint('index', url('index')),
+        Endpoint('contact', url('contact')),
+        Endpoint('catalog', url('products:products')),
+        Endpoint('catalog_category', url('products:category', category)),
+        Endpoint('catalog_filtered', lambda ctx: (reverse('products:category', args=[ctx.category()]),
+                                                  {'min_price': 1000, 'in_stock': 'on'})),
+        Endpoint('product', url('products:product', product)),
+        Endpoint('search', lambda ctx: (reverse('products:search'), {'q': ctx.random.choice(ctx.search_words)})),
+        Endpoint('api_products', lambda ctx: (reverse('products:api_products'), {'ordering': 'price'})),
+        Endpoint('api_products_ids', lambda ctx: (reverse('products:api_products'), {
+            'ids': ','.join(str(ctx.product()) for _ in range(20)), 'fields': 'pk,name,price,quantity'})),
+        Endpoint('api_categories', url('products:api_categories')),
+        Endpoint('auth_login', url('auth:login')),
+        Endpoint('auth_register', url('auth:register')),
+        Endpoint('auth_edit', url('auth:edit'), user='user'),
+        Endpoint('basket', url('basket:view'), user='user'),
+        Endpoint('basket_add', url('basket:add', BenchContext.stock_product), user='user'),
+        Endpoint('basket_edit', lambda ctx: (
+            reverse('basket:edit', args=[ctx.basket_item(), ctx.random.randint(1, 3)]), None),
+            user='user', ajax=True),
+        Endpoint('basket_edit_batch', lambda ctx: (reverse('basket:edit_batch'), {
+            'items': {str(ctx.basket_item()): ctx.random.randint(1, 3)}}), method='post', user='user', json=True),
+        Endpoint('order_list', url('order:list'), user='user'),
+        Endpoint('order_create_form', url('order:create'), user='user'),
+        Endpoint('order_create', BenchContext.order_create_data, method='post', user='user'),
+        Endpoint('order_checkout', BenchContext.checkout_data, method='post', user='user'),
+        Endpoint('order_read', url('order:read', BenchContext.order), user='user'),
+        Endpoint('order_update_form', url('order:update', BenchContext.order), user='user'),
+        Endpoint('order_update', BenchContext.order_update_data, method='post', user='user'),
+        Endpoint('order_product_price', lambda ctx: (f'/order/product/{ctx.product()}/price/', None),
+                 user='user', ajax=True),
+        Endpoint('order_product_prices', lambda ctx: (
+            reverse('order:product_prices'), {'ids': ','.join(str(ctx.product()) for _ in range(20))}),
+            user='user', ajax=True),
+        Endpoint('admin_users', url('admin_staff:users'), user='admin'),
+        Endpoint('admin_categories', url('admin_staff:categories'), user='admin'),
+        Endpoint('admin_products', url('admin_staff:products', category), user='admin'),
+        Endpoint('admin_product_update_form', url('admin_staff:product_update', product), user='admin'),
+    ]
+
+
+class BenchmarkRunner:
+    """
+    Прогоняет каждый эндпоинт через тестовый клиент Django: сначала прогрев,
+    затем замер задержки, потом один отдельный запрос под tracemalloc и
+    CaptureQueriesContext, чтобы инструментирование не искажало время.
+    """
+
+    def __init__(self, iterations=100, warmup=10, seed=0, only=None, progress=None):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.context = BenchContext(seed=seed)
+        self.only = set(only or ())
+        self.progress = progress or (lambda message: None)
+        self.clients = {}
+
+    def get_client(self, user):
+        if user not in self.clients:
+            # исключение во вьюхе считаем ошибкой (500), а не причиной остановить прогон
+            client = Client(raise_request_exception=False, HTTP_REFERER='http://testserver/products/')
+            if user is not None:
+                client.force_login(getattr(self.context, user))
+            self.clients[user] = client
+        return self.clients[user]
+
+    def call(self, endpoint, request=None):
+        # данные запроса готовятся до таймера и до подсчета запросов к базе
+        path, data = request or endpoint.request(self.context)
+        client = self.get_client(endpoint.user)
+        extra = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'} if endpoint.ajax else {}
+        if endpoint.json:
+            extra['content_type'] = 'application/json'
+            data = json.dumps(data)
+        started = time.perf_counter()
+        response = getattr(client, endpoint.method)(path, data or {}, **extra)
+        return time.perf_counter() - started, response.status_code
+
+    def measure(self, endpoint):
+        for _ in range(self.warmup):
+            self.call(endpoint)
+
+        timings, errors = [], 0
+        gc.collect()
+        for _ in range(self.iterations):
+            elapsed, status = self.call(endpoint)
+            timings.append(elapsed)
+            errors += status not in endpoint.status
+
+        request = endpoint.request(self.context)
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            self.call(endpoint, request)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        total = sum(timings)
+        return {
+            'iterations': len(timings),
+            'errors': errors,
+            'mean_ms': round(mean(timings) * 1000, 3),
+            'p50_ms': round(percentile(timings, 50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 99) * 1000, 3),
+            'rps': round(len(timings) / total, 1) if total else None,
+            'queries': len(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def run(self):
+        results = {}
+        for endpoint in get_endpoints():
+            if self.only and endpoint.name not in self.only:
+                continue
+            if endpoint.user and getattr(self.context, endpoint.user) is None:
+                self.progress(f'{endpoint.name}: skipped, no {endpoint.user} account')
+                continue
+            results[endpoint.name] = self.measure(endpoint)
+            self.progress(f'{endpoint.name}: {results[endpoint.name]}')
+        return {
+            'meta': {
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'cache': settings.CACHES['default']['BACKEND'],
+                'low_cache': settings.LOW_CACHE,
+                'iterations': self.iterations,
+                'warmup': self.warmup,
+                'products': Product.objects.count(),
+            },
+            'endpoints': results,
+        }
+
+
+def dump(results, fp):
+    json.dump(results, fp, ensure_ascii=False, indent=2)
@@ -0,0 +1,146 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image, UnidentifiedImageError
+
+VARIANTS_DIR = 'variants'
+FORMATS = {
+    'jpeg': ('jpg', 'JPEG'),
+    'webp': ('webp', 'WEBP'),
+}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def parse_variant(spec):
+    """'card' -> ('card', 'jpeg'), 'card.webp' -> ('card', 'webp')."""
+    size, _, fmt = spec.partition('.')
+    fmt = fmt or 'jpeg'
+    if size not in settings.IMAGE_VARIANTS or fmt not in FORMATS:
+        raise ValueError(f'unknown image variant: {spec}')
+    return size, fmt
+
+
+def variant_name(name, size, fmt):
+    # расширение исходника остается в имени: a.jpg и a.png не должны писать в один файл
+    return f'{VARIANTS_DIR}/{size}/{name}.{FORMATS[fmt][0]}'
+
+
+def failed_key(name, size, fmt):
+    return 'image_variant_failed_' + md5(f'{name}|{size}|{fmt}'.encode('utf-8')).hexdigest()
+
+
+def is_raster(name):
+    # svg и файлы без расширения (аватары из соцсетей) проверяем при открытии
+    return not name.lower().endswith('.svg')
+
+
+def make_variant(name, size, fmt, force=False):
+    """Создает вариант картинки на диске, возвращает его имя или None, если исходник не картинка."""
+    target_name = variant_name(name, size, fmt)
+    target = os.path.join(settings.MEDIA_ROOT, target_name)
+    if not force and os.path.exists(target):
+        return target_name
+    if not is_raster(name):
+        return None
+
+    # исходник, который не удалось прочитать, не открываем заново на каждой отрисовке шаблона
+    key = failed_key(name, size, fmt)
+    if not force and cache.get(key):
+        return None
+
+    source = os.path.join(settings.MEDIA_ROOT, name)
+    tmp = f'{target}.{os.getpid()}.tmp'
+    try:
+        with Image.open(source) as image:
+            image.thumbnail(settings.IMAGE_VARIANTS[size], Image.LANCZOS)
+            if fmt == 'jpeg' and image.mode != 'RGB':
+                # у jpeg нет прозрачности - кладем картинку на белый фон
+                rgba = image.convert('RGBA')
+                image = Image.new('RGB', rgba.size, (255, 255, 255))
+                image.paste(rgba, mask=rgba.getchannel('A'))
+            elif image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA')
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # пишем во временный файл и переименовываем, чтобы параллельный запрос не прочитал половину
+            image.save(tmp, FORMATS[fmt][1], quality=settings.IMAGE_VARIANT_QUALITY, optimize=True)
+            os.replace(tmp, target)
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        cache.set(key, True, settings.IMAGE_VARIANT_FAILED_TIMEOUT)
+        return None
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    cache.delete(key)
+    return target_name
+
+
+def make_variants(name, force=False):
+    made = 0
+    for size in settings.IMAGE_VARIANTS:
+        for fmt in settings.IMAGE_VARIANT_FORMATS:
+            if make_variant(name, size, fmt, force=force):
+                made += 1
+    return made
+
+
+def variant_url(name, spec):
+    """
+    Url готового варианта, пока его нет - url оригинала. Шаблон картинки не режет:
+    варианты создаются после загрузки (schedule_variants) и командой build_image_variants.
+    """
+    size, fmt = parse_variant(spec)
+    target_name = variant_name(name, size, fmt)
+    if os.path.exists(os.path.join(settings.MEDIA_ROOT, target_name)):
+        return f'{settings.MEDIA_URL}{target_name}'
+    return f'{settings.MEDIA_URL}{name}'
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def make_executor(workers):
+    """
+    Пул процессов для нарезки. Процессы запускаются через spawn, а не fork: иначе
+    дочерний процесс получит копию открытого соединения с базой и клиента кеша.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=init_worker)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = make_executor(settings.IMAGE_VARIANT_WORKERS)
+    return _executor
+
+
+def log_failure(name):
+    def callback(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error('image variants for %s failed', name, exc_info=future.exception())
+    return callback
+
+
+def schedule_variants(name):
+    """Фоновая нарезка вариантов после загрузки картинки."""
+    if name and is_raster(name):
+        get_executor().submit(make_variants, name).add_done_callback(log_failure(name))
+
+
+def iter_media_images(folders):
+    for folder in folders:
+        root = os.path.join(settings.MEDIA_ROOT, folder)
+        for dirpath, dirnames, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                yield os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
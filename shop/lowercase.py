@@ -0,0 +1,41 @@
+"""
+Копии текстовых полей в нижнем регистре для поиска по началу строки без учета
+регистра. LOWER() в SQLite понимает только латиницу, поэтому регистр снимает
+Python при сохранении, а в базе по копии строится обычный индекс.
+"""
+
+from django.db.models import Q
+
+# верхняя граница диапазона для поиска по префиксу
+PREFIX_END = '\U0010ffff'
+
+
+def lower(value, max_length=None):
+    return (value or '').lower()[:max_length]
+
+
+def prefix_q(field, query):
+    """Условие "field начинается с query" диапазоном вместо LIKE - работает по обычному индексу."""
+    query = lower(query)
+    return Q(**{f'{field}__gte': query, f'{field}__lt': query + PREFIX_END})
+
+
+class LowercaseFieldsMixin:
+    """
+    lowercase_fields = {'name': 'name_lower'} - при save() копия заполняется сама.
+    bulk_create обходит save(), поэтому объекты для него готовятся через fill_lowercase().
+    """
+    lowercase_fields = {}
+
+    def fill_lowercase(self):
+        for source, target in self.lowercase_fields.items():
+            setattr(self, target, lower(getattr(self, source), self._meta.get_field(target).max_length))
+        return self
+
+    def save(self, *args, **kwargs):
+        self.fill_lowercase()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *(target for source, target in self.lowercase_fields.items()
+                                                         if source in update_fields)}
+        super().save(*args, **kwargs)
@@ -0,0 +1,29 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from shop.benchmark import BenchmarkRunner, dump, get_endpoints
+
+
+class Command(BaseCommand):
+    help = 'Прогоняет эндпоинты магазина и пишет p50/p95/p99, rps, число запросов к БД и пик памяти в json'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--only', nargs='*', choices=[endpoint.name for endpoint in get_endpoints()],
+                            help='только указанные эндпоинты')
+        parser.add_argument('--output', help='файл для json, по умолчанию stdout')
+
+    def handle(self, *args, **options):
+        runner = BenchmarkRunner(iterations=options['iterations'], warmup=options['warmup'],
+                                 seed=options['seed'], only=options['only'],
+                                 progress=lambda message: self.stderr.write(message))
+        results = runner.run()
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fp:
+                dump(results, fp)
+        else:
+            dump(results, sys.stdout)
+            sys.stdout.write('\n')
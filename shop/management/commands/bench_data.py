@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop.benchmark import DataGenerator
+
+
+class Command(BaseCommand):
+    help = 'Генерирует синтетические данные для бенчмарка (не запускать на боевой базе)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=50)
+        parser.add_argument('--products', type=int, default=20000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--baskets', type=int, default=5000)
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        generator = DataGenerator(seed=options['seed'], batch_size=options['batch_size'],
+                                  progress=self.stdout.write)
+        generator.generate(options['categories'], options['products'], options['users'],
+                           options['baskets'], options['orders'])
+        self.stdout.write(self.style.SUCCESS(f'done in {time.monotonic() - started:.1f}s'))
@@ -0,0 +1,177 @@
+import base64
+import hashlib
+import json
+from math import ceil
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREV = 'p'
+
+
+def encode_cursor(values, direction, number):
+    data = json.dumps([direction, number, values], cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (direction, number, values); пустой курсор - первая страница."""
+    if not cursor:
+        return NEXT, 1, None
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, number, values = json.loads(data.decode('utf-8'))
+    except (ValueError, TypeError):
+        raise Http404('Неверный курсор страницы')
+    if direction not in (NEXT, PREV) or not isinstance(number, int) or not isinstance(values, list):
+        raise Http404('Неверный курсор страницы')
+    return direction, max(number, 1), values
+
+
+class KeysetPage:
+    def __init__(self, object_list, number, has_previous, has_next, paginator):
+        self.object_list = object_list
+        self.number = number
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self.paginator = paginator
+
+    def __repr__(self):
+        return f'<Page {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return ''
+        return encode_cursor(self.paginator.get_values(self.object_list[-1]), NEXT, self.number + 1)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return ''
+        return encode_cursor(self.paginator.get_values(self.object_list[0]), PREV, self.number - 1)
+
+
+class KeysetPaginator:
+    """
+    Постраничный вывод по ключу: страница выбирается условием
+    (поле1, поле2, ...) > (значения последней строки) вместо OFFSET,
+    поэтому время выборки не зависит от номера страницы.
+    Последним полем keyset должен быть уникальный столбец (обычно pk).
+    """
+
+    def __init__(self, object_list, per_page, keyset, count=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.keyset = tuple(keyset)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        if callable(self._count):
+            return self._count()
+        if self._count is not None:
+            return self._count
+        return self.object_list.count()
+
+    @cached_property
+    def num_pages(self):
+        return max(1, ceil(self.count / self.per_page))
+
+    def get_values(self, obj):
+        if isinstance(obj, dict):
+            return [obj[field.lstrip('-')] for field in self.keyset]
+        return [getattr(obj, field.lstrip('-')) for field in self.keyset]
+
+    def _seek(self, values, direction):
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.keyset, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != (direction == PREV) else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+
+        # нестрогое условие по первому полю дает базе диапазон по индексу
+        first = self.keyset[0]
+        lookup = 'lte' if first.startswith('-') != (direction == PREV) else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': values[0]}) & condition
+
+    def get_rows(self, cursor=None):
+        """Возвращает (rows, number, has_previous, has_next) - данные страницы без queryset."""
+        direction, number, values = decode_cursor(cursor)
+        queryset = self.object_list
+        ordering = self.keyset
+        if values is not None:
+            if len(values) != len(self.keyset):
+                raise Http404('Неверный курсор страницы')
+            queryset = queryset.filter(self._seek(values, direction))
+        if direction == PREV:
+            ordering = tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == PREV:
+            rows.reverse()
+            return rows, number, has_more, True
+        return rows, number, values is not None, has_more
+
+    def page(self, cursor=None, rows=None):
+        if rows is None:
+            rows = self.get_rows(cursor)
+        return KeysetPage(*rows, paginator=self)
+
+
+class KeysetPaginationMixin:
+    """Подмешивается к ListView вместо OFFSET-пагинации Django."""
+    keyset = ('pk',)
+    cursor_kwarg = 'cursor'
+    count_timeout = 60
+
+    def get_keyset(self):
+        return self.keyset
+
+    def get_cursor(self):
+        return self.request.GET.get(self.cursor_kwarg, '')
+
+    def get_total_count(self, queryset):
+        # точное число строк нужно только для "страница N из M", поэтому его можно кешировать
+        key = 'keyset_count_' + hashlib.md5(str(queryset.query).encode('utf-8')).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_timeout)
+        return count
+
+    def get_page_rows(self, paginator, cursor):
+        return paginator.get_rows(cursor)
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.get_keyset(),
+                                    count=lambda: self.get_total_count(queryset))
+        page = paginator.page(rows=self.get_page_rows(paginator, self.get_cursor()))
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -109,6 +109,61 @@ if os.name == 'posix':
 
 LOW_CACHE = True
 
+# записи каталога сбрасываются по версиям из сигналов, поэтому могут жить долго
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 6
+
+# страницы каталога кешируются целиком, меню пользователя подставляется на каждый запрос
+DONUT_CACHE_TIMEOUT = 60 * 5
+# то, что зависит от остатков (число товаров в наличии, фильтр "в наличии"), живет столько секунд,
+# а не сбрасывается версией - иначе каждое изменение корзины сбрасывало бы страницы категорий
+STOCK_CACHE_TIMEOUT = 30
+
+# горячее предложение выбирается из заранее посчитанного пула id
+HOT_PRODUCT_POOL_SIZE = 100
+HOT_PRODUCT_POOL_TIMEOUT = 60 * 10
+HOT_PRODUCT_WEIGHT = None  # None, 'quantity' или 'sales'
+
+SEARCH_RESULTS_LIMIT = 30
+
+# json api каталога
+API_DEFAULT_LIMIT = 50
+API_MAX_LIMIT = 500
+
+# диапазоны цен для фасетов каталога: (от, до), верхняя граница не включается
+PRICE_FACET_RANGES = (
+    (0, 1000),
+    (1000, 5000),
+    (5000, 20000),
+    (20000, None),
+)
+
+# корзина гостя хранится в кеше под ключом из cookie и переносится в базу при входе
+GUEST_BASKET_COOKIE = 'guest_basket'
+GUEST_BASKET_TIMEOUT = 60 * 60 * 24 * 7
+
+# корзины без изменений дольше BASKET_TTL секунд снимаются с резерва командой reap_baskets
+BASKET_TTL = 60 * 60 * 24 * 3
+BASKET_REAP_BATCH_SIZE = 500
+BASKET_REAP_PAUSE = 0.5
+BASKET_REAP_MAX_LOCK = 0.2  # если пачка держала запись дольше, следующая берется меньше
+
+# обработка заказов командой process_orders: задание, не завершенное за VISIBILITY_TIMEOUT
+# секунд, снова берется другим воркером; повтор после ошибки - через RETRY_DELAY * 2 ** попытка
+ORDER_QUEUE_WORKERS = 4
+ORDER_QUEUE_BATCH_SIZE = 10
+ORDER_QUEUE_VISIBILITY_TIMEOUT = 60
+ORDER_QUEUE_MAX_ATTEMPTS = 5
+ORDER_QUEUE_RETRY_DELAY = 10
+ORDER_QUEUE_MAX_RETRY_DELAY = 60 * 60
+ORDER_QUEUE_POLL_INTERVAL = 1
+# обработчики шагов: {статус, из которого идет шаг: 'путь.к.функции(order)'}, например оплата
+# для Order.PROCEEDED; для статуса без обработчика шаг - только смена статуса
+ORDER_STEP_HANDLERS = {}
+
+# в каталоге больше продуктов - в формах заказа вместо select поле с подсказками; None - всегда select.
+# select повторяется в каждой строке формсета, поэтому порог маленький
+ORDER_PRODUCT_SELECT_LIMIT = 100
+
 ROOT_URLCONF = 'shop.urls'
 
 TEMPLATES = [
@@ -202,6 +257,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# варианты картинок товаров и аватаров: имя -> максимальный размер, складываются в media/variants
+IMAGE_VARIANTS = {
+    'thumb': (70, 70),
+    'small': (100, 100),
+    'card': (270, 270),
+    'large': (800, 800),
+}
+IMAGE_VARIANT_FORMATS = ('jpeg', 'webp')
+IMAGE_VARIANT_QUALITY = 82
+IMAGE_VARIANT_WORKERS = 2
+# сколько секунд не пытаться снова нарезать битый или пропавший исходник
+IMAGE_VARIANT_FAILED_TIMEOUT = 60 * 60
 LOGIN_URL = '/auth/login/'
 
 # DOMAIN_NAME = env('DOMAIN_NAME')
@@ -1,15 +1,74 @@
 window.onload = function () {
-    $('.basket_list').on('click', 'input[type="number"]', function () {
-        var t_href = event.target;
+    var pending = {};
+    var timer = null;
 
+    // полная перерисовка списка - запасной путь, если точечное обновление не прошло
+    function reload_item(pk, quantity) {
         $.ajax({
-            url: "/basket/edit/" + t_href.name + "/" + t_href.value + "/",
+            url: "/basket/edit/" + pk + "/" + quantity + "/",
 
             success: function (data) {
                 $('.basket_list').html(data.result);
             },
+            error: function (xhr) {
+                if (xhr.status === 409 && xhr.responseJSON) {
+                    $('.basket_list').html(xhr.responseJSON.result);
+                    alert('Недостаточно товара на складе');
+                }
+            },
+        });
+    }
+
+    function apply_changes(data) {
+        $.each(data.items, function (i, item) {
+            var row = $('tr[data-basket-item="' + item.pk + '"]');
+            row.find('input[type="number"]').val(item.quantity);
+            row.find('.product_cost').html(item.cost + '&nbspруб');
         });
+        $.each(data.removed, function (i, pk) {
+            $('tr[data-basket-item="' + pk + '"]').remove();
+        });
+        if (data.summary.items) {
+            $('.basket_total_quantity').text(data.summary.quantity);
+            $('.basket_total_cost').text(data.summary.cost);
+        } else {
+            $('.basket_summary').remove();
+        }
+    }
+
+    function send() {
+        var changes = pending;
+        pending = {};
+        timer = null;
+
+        $.ajax({
+            url: "/basket/edit/",
+            method: "POST",
+            contentType: "application/json",
+            headers: {"X-CSRFToken": $('input[name="csrfmiddlewaretoken"]').val()},
+            data: JSON.stringify({items: changes}),
+
+            success: function (data) {
+                if (data.missing.length) {
+                    $.each(changes, reload_item);
+                    return;
+                }
+                apply_changes(data);
+            },
+            error: function () {
+                $.each(changes, reload_item);
+            },
+        });
+    }
+
+    $('.basket_list').on('change', 'input[type="number"]', function (event) {
+        var t_href = event.target;
+        pending[t_href.name] = parseInt(t_href.value) || 0;
 
-        event.preventDefault();
+        // несколько быстрых изменений уходят одним запросом
+        if (timer) {
+            clearTimeout(timer);
+        }
+        timer = setTimeout(send, 300);
     });
-}
\ No newline at end of file
+}
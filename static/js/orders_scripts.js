@@ -62,33 +62,115 @@ window.onload = function () {
         removed: deleteOrderItem
     });
 
-    $('.order_form select').change(function () {
+    // текущие цены каталога по pk - только из API; снимки цен сохраненных строк лежат в price_arr
+    var prices = {};
+
+    function fetchPrices(pks, callback) {
+        var missing = pks.filter(function (pk) {
+            return pk && !(pk in prices);
+        });
+        if (!missing.length) {
+            callback();
+            return;
+        }
+        $.ajax({
+            url: "/order/products/prices/",
+            data: {ids: missing.join(',')},
+            success: function (data) {
+                for (var pk in data.prices) {
+                    prices[pk] = data.prices[pk];
+                }
+                callback();
+            },
+        });
+    }
+
+    function setRowPrice(num, pk) {
+        if (!(pk in prices)) {
+            return;
+        }
+        price_arr[num] = parseFloat(prices[pk]);
+        if (isNaN(quantity_arr[num])) {
+            quantity_arr[num] = 0;
+        }
+        var price_html = '<span class="orderitems-' + num + '-price">' + prices[pk].toString().replace('.', ',') + '</span> руб';
+        var current_tr = $('.order_form table').find('tr:eq(' + (num + 1) + ')');
+        current_tr.find('td:eq(2)').html(price_html);
+        if (isNaN(current_tr.find('input[type="number"]').val())) {
+            current_tr.find('input[type="number"]').val(0);
+        }
+    }
+
+    function rowProduct(num) {
+        // select или скрытое поле автодополнения
+        return $('[name="orderitems-' + num + '-product"]').val();
+    }
+
+    // цены для строк без цены (например, форма вернулась с ошибками) - одним запросом на все строки
+    var row_pks = [];
+    for (var i=0; i < TOTAL_FORMS; i++) {
+        var pk = rowProduct(i);
+        if (pk && !price_arr[i]) {
+            row_pks.push(pk);
+        }
+    }
+    if (row_pks.length) {
+        fetchPrices(row_pks, function () {
+            for (var i=0; i < TOTAL_FORMS; i++) {
+                if (!price_arr[i] && rowProduct(i)) {
+                    setRowPrice(i, rowProduct(i));
+                }
+            }
+            orderSummaryRecalc();
+        });
+    }
+
+    // автодополнение: подсказки из JSON API каталога, цены из них сразу попадают в prices
+    var suggest_timer;
+
+    $('.order_form').on('input', 'input.product-autocomplete', function (event) {
+        var input = $(event.target);
+        var list = $('#' + input.attr('list'));
+        clearTimeout(suggest_timer);
+        if (input.val().length < 2) {
+            return;
+        }
+        suggest_timer = setTimeout(function () {
+            $.ajax({
+                url: input.data('url'),
+                data: {q: input.val(), fields: 'pk,name,price', limit: 20},
+                success: function (data) {
+                    list.empty();
+                    data.results.forEach(function (product) {
+                        prices[product.pk] = product.price;
+                        list.append($('<option>').attr('value', product.name).attr('data-pk', product.pk)
+                            .text(product.price.toString().replace('.', ',') + ' руб'));
+                    });
+                },
+            });
+        }, 300);
+    });
+
+    $('.order_form').on('change', 'input.product-autocomplete', function (event) {
+        var input = $(event.target);
+        var option = $('#' + input.attr('list')).find('option').filter(function () {
+            return this.value === input.val();
+        }).first();
+        if (option.length) {
+            input.siblings('input.product-autocomplete-value').val(option.data('pk')).trigger('change');
+        }
+    });
+
+    $('.order_form').on('change', 'select, input.product-autocomplete-value', function (event) {
         var target = event.target;
-        orderitem_num = parseInt(target.name.replace('orderitems-', '').replace('-product', ''));
-        var orderitem_product_pk = target.options[target.selectedIndex].value;
+        var num = parseInt(target.name.replace('orderitems-', '').replace('-product', ''));
+        var orderitem_product_pk = target.value;
 
         if (orderitem_product_pk) {
-           $.ajax({
-               url: "/order/product/" + orderitem_product_pk + "/price/",
-               success: function (data) {
-                   if (data.price) {
-                       price_arr[orderitem_num] = parseFloat(data.price);
-                       if (isNaN(quantity_arr[orderitem_num])) {
-                           quantity_arr[orderitem_num] = 0;
-                       }
-                       var price_html = '<span class="orderitems-' + orderitem_num + '-price">' + data.price.toString().replace('.', ',') +'</span> руб';
-
-                       var current_tr = $('.order_form table').find('tr:eq(' + (orderitem_num + 1) + ')');
-
-                       current_tr.find('td:eq(2)').html(price_html);
-
-                       if (isNaN(current_tr.find('input[type="number"]').val())) {
-                           current_tr.find('input[type="number"]').val(0);
-                       }
-                       orderSummaryRecalc();
-                   }
-               },
-           });
+            fetchPrices([orderitem_product_pk], function () {
+                setRowPrice(num, orderitem_product_pk);
+                orderSummaryRecalc();
+            });
         }
     });
 